@@ -1,23 +1,96 @@
 import streamlit as st
 import os
-from report_generator import extract_data_from_markdown
+import threading
+from report_generator import extract_data_cached, content_cache_key
 from html_slides_generator import generate_html_slides
+from html_template import load_template
+from asset_registry import get_asset_registry
+from report_service import ReportServiceClient
+from pdf_ingest import pdf_to_markdown, pdf_cache_key
+from tracing import configure_logging, span, trace
+from fonts import warm_up
+
+# 設定されている場合は生成処理をレポート生成サービス (python -m report_service) に任せる
+REPORT_SERVICE_URL = os.environ.get("REPORT_SERVICE_URL")
+
+# 生成結果のキャッシュ (保持時間 [秒] と件数の上限)
+REPORT_CACHE_TTL = 3600
+REPORT_CACHE_MAX_ENTRIES = 64
+
+
+@st.cache_resource
+def load_resources():
+    """
+    テンプレートと埋め込み画像をプロセスにつき1回だけ読み込む
+    """
+    # 処理段階ごとの所要時間を JSON 1行ずつログに出す
+    configure_logging()
+    load_template("report_slides.html")
+    registry = get_asset_registry()
+    registry.preload(["individual_bpi.png", "energy_breakdown.png", "energy_comparison.png"])
+    # PowerPoint用の描画ライブラリ (slides / matplotlib) は起動を遅くしないよう、作成を求められるまで読み込まない
+    # フォントキャッシュの作成 (コンテナでは python -m fonts で作成済み) だけは画面の表示を待たせずに済ませておく
+    threading.Thread(target=warm_up, name="fonts-warm-up", daemon=True).start()
+    return registry
+
+
+@st.cache_resource
+def get_service_client():
+    return ReportServiceClient(REPORT_SERVICE_URL)
+
+
+@st.cache_data(ttl=REPORT_CACHE_TTL, max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def generate_report(content_key, _content, is_pdf=False):
+    """
+    抽出データとHTMLレポート、生成時の処理段階ごとの所要時間 (アップロード内容のハッシュ content_key ごとに1回だけ生成する)
+    ダウンロードボタンなどによる再実行では生成し直さない
+    """
+    with trace("html_report", content_key[:16]) as current:
+        if is_pdf:
+            with span("pdf_ingest") as s:
+                _content = pdf_to_markdown(_content)
+                s.add_bytes(_content)
+        if REPORT_SERVICE_URL:
+            with span("report_service"):
+                data, html_report = get_service_client().generate(_content)
+        else:
+            data = extract_data_cached(_content)
+            html_report = generate_html_slides(data)
+    return data, html_report, current.breakdown()
+
+
+@st.cache_data(ttl=REPORT_CACHE_TTL, max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def generate_pptx(content_key, _data):
+    """
+    PowerPointレポートと生成時の処理段階ごとの所要時間 (content_key ごとに1回だけ生成する)
+    """
+    from slides import generate_pptx_report
+    with trace("pptx_report", content_key[:16]) as current:
+        pptx_report = generate_pptx_report(_data).getvalue()
+    return pptx_report, current.breakdown()
+
+
+load_resources()
 
 st.set_page_config(page_title="one building - 技術レポート生成", layout="wide")
 
 st.title("one building 技術レポート生成 (v1.4.11)")
 st.markdown("""
-Markdown形式の省エネ診断結果をアップロードしてください。
-モデル建物法の詳細分析と、標準入力法へのアップグレード提案を含むHTMLレポートを生成します。
+Markdown形式またはPDFの省エネ診断結果をアップロードしてください。
+モデル建物法の詳細分析と、標準入力法へのアップグレード提案を含むHTML / PowerPointレポートを生成します。
 """)
 
-uploaded_file = st.file_uploader("Markdownファイルをアップロード (.md, .txt)", type=["md", "txt"])
+uploaded_file = st.file_uploader("Markdown/PDFファイルをアップロード (.md, .txt, .pdf)", type=["md", "txt", "pdf"])
 
 if uploaded_file:
-    content = uploaded_file.read().decode("utf-8")
-    
     with st.spinner("データを解析中..."):
-        data = extract_data_from_markdown(content)
+        content = uploaded_file.getvalue()
+        if uploaded_file.name.lower().endswith(".pdf"):
+            content_key = pdf_cache_key(content)
+            data, html_report, html_spans = generate_report(content_key, content, is_pdf=True)
+        else:
+            content_key = content_cache_key(content)
+            data, html_report, html_spans = generate_report(content_key, content)
         
         st.success(f"解析完了: {data['building_name']}")
         
@@ -26,18 +99,37 @@ if uploaded_file:
         col2.metric("BPIm / BPI", f"{data['bpi']:.2f}")
         col3.metric("床面積", f"{data['total_area']:,} m²")
 
-        # HTMLレポート生成
-        html_report = generate_html_slides(data)
-        
         st.subheader("レポート出力")
-        st.download_button(
+        col_html, col_pptx = st.columns(2)
+        col_html.download_button(
             label="HTMLレポートをダウンロード",
             data=html_report,
             file_name=f"Technical_Report_{data['building_name']}.html",
             mime="text/html"
         )
+        # PowerPointはHTMLより作成に時間がかかるため、求められたアップロードについてだけ作成する
+        pptx_spans = []
+        if (col_pptx.button("PowerPointレポートを作成")
+                or st.session_state.get("pptx_content_key") == content_key):
+            st.session_state["pptx_content_key"] = content_key
+            with st.spinner("PowerPointレポートを作成中..."):
+                pptx_report, pptx_spans = generate_pptx(content_key, data)
+            col_pptx.download_button(
+                label="PowerPointレポートをダウンロード",
+                data=pptx_report,
+                file_name=f"Technical_Report_{data['building_name']}.pptx",
+                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+            )
         
         st.info("ダウンロードしたHTMLファイルをブラウザで開くと、プレゼンテーション形式で閲覧できます。")
 
+        with st.expander("パフォーマンス (処理段階ごとの所要時間)"):
+            st.caption("このレポートを生成した時点の計測値です (キャッシュから表示した場合は再計測しません)")
+            st.dataframe(
+                [{"レポート": "HTML", **record} for record in html_spans]
+                + [{"レポート": "PowerPoint", **record} for record in pptx_spans],
+                width="stretch",
+            )
+
 st.divider()
 st.caption("© 2026 one building. 全ての権利を保有。")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静的画像の管理モジュール
+レポートに埋め込む画像の場所を1度だけ探し、base64化した結果を更新日時が変わるまで使い回す
+"""
+
+import base64
+import os
+import threading
+
+# 探索先の既定値 (環境変数 ONE_BUILDING_ASSET_PATH に os.pathsep 区切りで指定すると先に探す)
+DEFAULT_SEARCH_PATHS = [
+    os.path.dirname(os.path.abspath(__file__)),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_app'),
+    '/home/ubuntu/streamlit_app',
+    '/app',
+    '/app/streamlit_app',
+]
+
+
+def _env_search_paths():
+    value = os.environ.get('ONE_BUILDING_ASSET_PATH', '')
+    return [path for path in value.split(os.pathsep) if path]
+
+
+class AssetRegistry:
+    """
+    ファイル名 → (パス, 更新日時, 内容, base64文字列) の対応を保持する
+    見つからなかったファイル名は探索先ディレクトリの更新日時とともに覚え、ディレクトリが変わるまで探し直さない
+    """
+
+    def __init__(self, search_paths=None):
+        self.search_paths = list(search_paths) if search_paths is not None else \
+            _env_search_paths() + DEFAULT_SEARCH_PATHS
+        self._entries = {}
+        self._misses = {}
+        self._lock = threading.Lock()
+
+    def set_search_paths(self, search_paths):
+        with self._lock:
+            self.search_paths = list(search_paths)
+            self._entries.clear()
+            self._misses.clear()
+
+    def _resolve(self, filename):
+        for directory in self.search_paths:
+            filepath = os.path.join(directory, filename)
+            if os.path.exists(filepath):
+                return filepath
+        return None
+
+    def _directory_mtimes(self, filename):
+        # ファイルが置かれるはずのディレクトリの更新日時 (ディレクトリが無い場合は None)
+        mtimes = []
+        for directory in self.search_paths:
+            try:
+                mtimes.append(os.stat(os.path.dirname(os.path.join(directory, filename))).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _entry(self, filename):
+        entry = self._entries.get(filename)
+        if entry is not None:
+            try:
+                if os.stat(entry[0]).st_mtime_ns == entry[1]:
+                    return entry
+            except OSError:
+                pass
+        miss = self._misses.get(filename)
+        if miss is not None and miss == self._directory_mtimes(filename):
+            return None
+        try:
+            mtimes = self._directory_mtimes(filename)
+            filepath = self._resolve(filename)
+            if filepath is None:
+                # 画像が見つからない場合
+                with self._lock:
+                    self._misses[filename] = mtimes
+                return None
+            with open(filepath, "rb") as f:
+                mtime = os.fstat(f.fileno()).st_mtime_ns
+                content = f.read()
+        except Exception as e:
+            print(f"Error loading image {filename}: {e}")
+            return None
+        entry = (filepath, mtime, content, base64.b64encode(content).decode("utf-8"))
+        with self._lock:
+            self._entries[filename] = entry
+            self._misses.pop(filename, None)
+        return entry
+
+    def get_base64(self, filename):
+        """
+        画像のbase64文字列 (見つからない場合は空文字)
+        """
+        entry = self._entry(filename)
+        return entry[3] if entry is not None else ""
+
+    def get_bytes(self, filename):
+        """
+        画像の内容 (見つからない場合は None)
+        """
+        entry = self._entry(filename)
+        return entry[2] if entry is not None else None
+
+    def preload(self, filenames):
+        """
+        起動時に読み込んでおく
+        """
+        for filename in filenames:
+            self.get_base64(filename)
+
+
+_REGISTRY = AssetRegistry()
+
+def get_asset_registry():
+    return _REGISTRY
+
+def set_asset_search_paths(search_paths):
+    """
+    画像の探索先を変更する
+    """
+    _REGISTRY.set_search_paths(search_paths)
+
+def get_image_base64(filename):
+    return _REGISTRY.get_base64(filename)
+
+def get_image_bytes(filename):
+    return _REGISTRY.get_bytes(filename)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML / PowerPointレポート一括生成
+python -m batch_report "入力/*.md" [...] -o 出力ディレクトリ [-j 並列数] [--chunksize N] [--format html|pptx]
+出力は入力の共通の親ディレクトリからの相対パスで 出力ディレクトリ の下に作る
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# 出力形式 → 拡張子
+FORMATS = {"html": ".html", "pptx": ".pptx"}
+
+
+def _init_worker(output_format="html"):
+    """
+    ワーカー起動時に1度だけ、テンプレートと埋め込み画像を読み込んでおく
+    """
+    from html_template import load_template
+    from asset_registry import get_asset_registry
+    load_template("report_slides.html")
+    get_asset_registry().preload(["individual_bpi.png", "energy_breakdown.png", "energy_comparison.png"])
+    if output_format == "pptx":
+        from slides import preload_pptx_resources
+        preload_pptx_resources()
+
+
+def render_report(data, output_format="html"):
+    """
+    抽出データから出力形式のレポートを作成する (html は文字列、pptx はバイト列)
+    """
+    if output_format == "pptx":
+        from slides import generate_pptx_report
+        return generate_pptx_report(data).getvalue()
+    from html_slides_generator import generate_html_slides
+    return generate_html_slides(data)
+
+
+def _process_file(task):
+    """
+    1ファイル分の抽出とレポート生成 (例外はここで受け止めて他のファイルに影響させない)
+    """
+    path, output_path, output_format = task
+    from report_generator import extract_data_from_stream
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            data = extract_data_from_stream(f)
+        report = render_report(data, output_format)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if isinstance(report, str):
+            report = report.encode("utf-8")
+        with open(output_path, "wb") as f:
+            f.write(report)
+        return path, None, time.perf_counter() - start
+    except Exception as e:
+        return path, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+def expand_inputs(patterns):
+    """
+    glob パターンを展開する (重複は除き、指定順を保つ)
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or ([pattern] if os.path.isfile(pattern) else [])
+        paths.extend(path for path in matches if os.path.isfile(path))
+    return list(dict.fromkeys(paths))
+
+
+def output_paths(paths, output_dir, output_format="html"):
+    """
+    入力ファイルの共通の親ディレクトリからの相対パスを output_dir の下に再現した出力先
+    (in/a/report.md と in/b/report.md → 出力/a/report.html と 出力/b/report.html)
+    """
+    if not paths:
+        return []
+    sources = [os.path.abspath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(source) for source in sources])
+    return [os.path.join(output_dir, os.path.relpath(os.path.splitext(source)[0], root) + FORMATS[output_format])
+            for source in sources]
+
+
+def run_batch(paths, output_dir, jobs=None, chunksize=8, output_format="html"):
+    """
+    プロセスプールで一括生成し、(パス, エラー, 所要時間) の一覧と全体の経過時間を返す (生成しなかった入力の所要時間は None)
+    出力先が先の入力と重なる入力 (同じディレクトリの report.md と report.txt など) は生成せず失敗とする
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    collisions = {}
+    claimed = {}
+    for path, output_path in zip(paths, output_paths(paths, output_dir, output_format)):
+        key = os.path.normcase(output_path)
+        if key in claimed:
+            collisions[path] = f"出力先 {output_path} が {claimed[key]} と重複しています"
+        else:
+            claimed[key] = path
+            tasks.append((path, output_path, output_format))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(output_format,)) as executor:
+        processed = iter(executor.map(_process_file, tasks, chunksize=max(1, chunksize)))
+        results = [(path, collisions[path], None) if path in collisions else next(processed) for path in paths]
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    latencies = np.array([latency for _, _, latency in results if latency is not None]) * 1000
+    failed = [(path, error) for path, error, _ in results if error]
+    lines = [f"{len(results) - len(failed)}/{len(results)} 件成功 ({elapsed:.2f}秒, {len(latencies) / elapsed:.1f} 件/秒)"
+             if elapsed > 0 else f"{len(results) - len(failed)}/{len(results)} 件成功"]
+    if len(latencies):
+        lines.append(f"1件あたり p50 {np.percentile(latencies, 50):.1f}ms / p95 {np.percentile(latencies, 95):.1f}ms")
+    lines.extend(f"失敗: {path}: {error}" for path, error in failed)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Markdownの計算結果からHTML / PowerPointレポートを一括生成する")
+    parser.add_argument("inputs", nargs="+", help="入力ファイルまたは glob パターン")
+    parser.add_argument("-o", "--output-dir", required=True, help="出力ディレクトリ")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="並列数 (既定はCPU数)")
+    parser.add_argument("--chunksize", type=int, default=8, help="ワーカーへまとめて渡すファイル数")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="html", help="出力形式 (既定は html)")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("入力ファイルが見つかりません", file=sys.stderr)
+        return 2
+    results, elapsed = run_batch(paths, args.output_dir, args.jobs, args.chunksize, args.format)
+    print(summarize(results, elapsed))
+    return 1 if any(error for _, error, _ in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能計測スクリプト
+python benchmark.py [チェック名 ...]  (省略時は全チェックを実行し、失敗があれば終了コード1)
+python benchmark.py --update-baselines stages  (現在の計測値を基準値として保存する)
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from report_generator import extract_data_from_markdown
+
+# ファジング用の断片 (見出しだけの区画、途中で切れた表の行、値の無いラベルなど)
+FUZZ_FRAGMENTS = [
+    "**機械室**\n", "**便所**\n", "**駐車場**\n", "**厨房**\n", "**洗面手洗い**\n", "**浴室**\n",
+    "### 換気\n", "# \n", "#\n", "##\n",
+    "| V5 | 高効率電動機の有無 | 無 |\n", "| V6 | インバータの有無 | 有 |\n", "| V7 |",
+    "| V5 |", "| V6 | インバータの有無 ", "| HW4 | 配管保温仕様 | 裸管 |\n", "| HW5 |",
+    "| L4 | 在室検知制御 | 有 |\n", "| L5 |", "| L6 | タイムスケジュール制御 |\n",
+    "建築物の名称\n", "床面積\n", "所在地：", "地域区分/年間日射地域区分\n", "モデル建物\n",
+    "| 年間熱負荷係数 【BPIm】 | ", "| 一次エネルギー消費量 【BEIm】 |\n", "| PAL6 | 外壁面積-北 |",
+    "| AC1 | 主たる熱源機種（冷房） |", "| 太陽光発電 |", "| コージェネレーション設備",
+    "| 1,544.18 | 0.00 | 0.00 |\n", "|" * 20, " " * 40, "\n\n", "*", "x" * 40,
+]
+
+
+def make_fuzz_document(size, seed=0):
+    """
+    断片をランダムに連結して size 文字程度の文書を作る
+    """
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        fragment = rng.choice(FUZZ_FRAGMENTS)
+        parts.append(fragment)
+        length += len(fragment)
+    return "".join(parts)
+
+
+def time_call(func, *args, repeat=3):
+    """
+    最小実行時間 (秒)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_parse_scaling(base_size=50_000, factor=8, max_ratio=3.0, seeds=5):
+    """
+    壊れた入力でも解析時間が入力サイズに対して線形に収まることを確認する
+    (factor 倍の入力での1文字あたりの時間が max_ratio 倍を超えたら失敗)
+    """
+    ok = True
+    for seed in range(seeds):
+        small = make_fuzz_document(base_size, seed)
+        large = make_fuzz_document(base_size * factor, seed)
+        t_small = time_call(extract_data_from_markdown, small)
+        t_large = time_call(extract_data_from_markdown, large)
+        ratio = (t_large / len(large)) / (t_small / len(small))
+        print(f"parse-scaling seed={seed}: {len(small):,}字 {t_small * 1000:.1f}ms / "
+              f"{len(large):,}字 {t_large * 1000:.1f}ms (1文字あたり x{ratio:.2f})")
+        if ratio > max_ratio:
+            ok = False
+    return ok
+
+
+def import_time(module, repeat=3):
+    """
+    python -X importtime で計った module の読み込み時間 (秒、最小値) と、読み込まれたモジュール名
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = float("inf")
+    loaded = set()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=here, capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative [us] | モジュール名
+            fields = line.split("|")
+            if len(fields) != 3 or not fields[1].strip().isdigit():
+                continue
+            name = fields[2].strip()
+            loaded.add(name)
+            if name == module:
+                best = min(best, int(fields[1]) / 1e6)
+    return best, loaded
+
+
+def check_import_time(budget=0.15, heavy=("pandas", "matplotlib", "numpy")):
+    """
+    import report_generator が budget 秒以内に終わり、重い依存を読み込まないことを確認する
+    """
+    elapsed, loaded = import_time("report_generator")
+    eager = [name for name in heavy if name in loaded]
+    print(f"import-time report_generator: {elapsed * 1000:.1f}ms (上限 {budget * 1000:.0f}ms)"
+          + (f", 読み込み済み: {', '.join(eager)}" if eager else ""))
+    return elapsed <= budget and not eager
+
+
+def check_zeb_screening(count=2000, seed=0):
+    """
+    ZEB比較の一括判定が1棟ずつの判定 (get_zeb_comparison) と一致することを確認し、所要時間を比べる
+    """
+    from portfolio import Portfolio
+    from report_generator import get_zeb_comparison
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, "test_sample.txt"), encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    rng = random.Random(seed)
+    reports = []
+    for _ in range(count):
+        # 行の一部を抜き出した文書とファジング用の断片で、値の有無がばらつくようにする
+        sample = rng.sample(lines, rng.randrange(len(lines)))
+        reports.append(extract_data_from_markdown("\n".join(sample) + make_fuzz_document(500, rng.random())))
+    portfolio = Portfolio.from_reports(reports)
+    start = time.perf_counter()
+    passed, _ = portfolio.zeb_screening()
+    t_vector = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = [[item["status"] == "良好" for item in get_zeb_comparison(report)] for report in reports]
+    t_loop = time.perf_counter() - start
+    ok = passed.to_numpy().tolist() == expected
+    print(f"zeb-screening: {count}棟 一括 {t_vector * 1000:.1f}ms / 1棟ずつ {t_loop * 1000:.1f}ms"
+          + ("" if ok else " (判定が一致しません)"))
+    return ok
+
+
+def export_throughput(output_format, count=50):
+    """
+    test_sample.txt の解析からレポート作成までを count 回繰り返したときの 件/秒 と最大常駐メモリ (MB)
+    (1回目は画像の読み込みやマスターの作成を含むため除く)
+    """
+    from batch_report import render_report
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, "test_sample.txt"), encoding="utf-8") as f:
+        content = f.read()
+    render_report(extract_data_from_markdown(content), output_format)
+    start = time.perf_counter()
+    for _ in range(count):
+        render_report(extract_data_from_markdown(content), output_format)
+    elapsed = time.perf_counter() - start
+    return count / elapsed, peak_rss_mb()
+
+
+def peak_rss_mb():
+    """
+    このプロセスの最大常駐メモリ (MB)
+    ru_maxrss は起動元のプロセスの値を引き継ぐため、Linux では /proc/self/status の VmHWM を使う
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS はバイト単位、Linux は KB 単位
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def check_export_throughput(count=50, min_rates=None, max_rss_mb=256):
+    """
+    HTML / PowerPoint の作成が min_rates (件/秒) 以上で、最大常駐メモリが max_rss_mb 以内に収まることを確認する
+    (形式ごとに別プロセスで計測し、互いのメモリ使用量を含めない)
+    """
+    min_rates = min_rates or {"html": 100, "pptx": 50}
+    here = os.path.dirname(os.path.abspath(__file__))
+    ok = True
+    for output_format, min_rate in min_rates.items():
+        code = ("import json, benchmark; "
+                f"print(json.dumps(benchmark.export_throughput({output_format!r}, {count})))")
+        result = subprocess.run([sys.executable, "-W", "ignore", "-c", code],
+                                cwd=here, capture_output=True, text=True, check=True)
+        rate, rss = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"export-throughput {output_format}: {rate:.1f} 件/秒 (下限 {min_rate}) / "
+              f"最大RSS {rss:.0f}MB (上限 {max_rss_mb}MB)")
+        if rate < min_rate or rss > max_rss_mb:
+            ok = False
+    return ok
+
+
+# 段階別の計測に使う入力の大きさ (バイト)
+STAGE_SIZES = {"10KB": 10_000, "100KB": 100_000, "1MB": 1_000_000, "10MB": 10_000_000}
+# 基準値の保存先と、基準値から何割遅くなったら失敗とするか
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baselines.json")
+REGRESSION_THRESHOLD = 0.5
+# 計測の揺らぎで失敗しないよう、基準値との差がこれ (秒) 未満なら許容する
+REGRESSION_SLACK = 0.002
+
+
+def make_scaled_document(size):
+    """
+    test_sample.txt の後ろに入力シート (様式) の区画を繰り返して size バイト程度にした文書
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, "test_sample.txt"), encoding="utf-8") as f:
+        content = f.read()
+    if len(content.encode("utf-8")) >= size:
+        # 小さい入力は先頭の概要と判定の部分だけを使う
+        return content.encode("utf-8")[:size].decode("utf-8", "ignore")
+    filler = "\n" + content[content.index("### 様式"):]
+    filler_size = len(filler.encode("utf-8"))
+    repeat = (size - len(content.encode("utf-8"))) // filler_size + 1
+    return content + filler * repeat
+
+
+def stage_inputs():
+    """
+    ZEB比較以降の段階に渡す抽出データ (計算方法ごと)
+    後段の処理時間は文書の大きさではなく抽出された項目で決まるため、大きさではなく計算方法で分ける
+    モデル建物法は test_model.pdf をMarkdownに変換したもの (詳細項目・換気・照明・給湯の区画を含む)
+    """
+    from pdf_ingest import pdf_to_markdown
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, "test_sample.txt"), encoding="utf-8") as f:
+        standard = extract_data_from_markdown(f.read())
+    model = extract_data_from_markdown(pdf_to_markdown(os.path.join(here, "test_model.pdf")))
+    return {"standard_input": standard, "model_building": model}
+
+
+def _stage_functions():
+    """
+    段階名 → 抽出データを受け取って1回分の処理を行う関数
+    """
+    from html_slides_generator import generate_html_slides
+    from report_generator import create_radar_chart, get_radar_chart_cache, get_zeb_comparison
+    from slides import create_presentation, get_chart_images, preload_pptx_resources
+    preload_pptx_resources()
+    chart_stacked, chart_pie = get_chart_images()
+
+    def chart(data):
+        # 描画済みのPNGを使わず毎回描画する
+        get_radar_chart_cache().clear()
+        return create_radar_chart(data)
+
+    def presentation(data):
+        return create_presentation(data, chart_stacked, chart_pie, create_radar_chart(data))
+
+    return {
+        "compare": get_zeb_comparison,
+        "chart": chart,
+        "html": generate_html_slides,
+        "pptx": presentation,
+    }
+
+
+def measure_stages(sizes=None, repeat=3):
+    """
+    入力の大きさごとの解析 (parse) と、計算方法ごとの ZEB比較 (compare) / レーダーチャート (chart) /
+    HTML作成 (html) / PowerPoint作成 (pptx) の最小実行時間 (秒) を計る
+    返り値は "parse@大きさ" または "段階@計算方法" → 秒
+    """
+    results = {}
+    for label, size in (sizes or STAGE_SIZES).items():
+        document = make_scaled_document(size)
+        results[f"parse@{label}"] = time_call(extract_data_from_markdown, document, repeat=repeat)
+    stages = _stage_functions()
+    for method, data in stage_inputs().items():
+        for name, func in stages.items():
+            func(data)  # 1回目は図やマスターの作成を含むため除く
+            results[f"{name}@{method}"] = time_call(func, data, repeat=repeat)
+    return results
+
+
+def load_baselines(path=BASELINE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(results, path=BASELINE_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({key: round(value, 6) for key, value in results.items()}, f, indent=2)
+        f.write("\n")
+
+
+def check_stages(update_baselines=False, threshold=REGRESSION_THRESHOLD):
+    """
+    段階別の実行時間を基準値 (benchmark_baselines.json) と比べ、threshold 割を超えて遅くなっていないことを確認する
+    update_baselines=True では比較せずに計測値を基準値として保存する
+    """
+    results = measure_stages()
+    baselines = {} if update_baselines else load_baselines()
+    ok = True
+    for key, elapsed in results.items():
+        baseline = baselines.get(key)
+        line = f"stages {key}: {elapsed * 1000:.2f}ms"
+        if baseline:
+            ratio = elapsed / baseline
+            regressed = ratio > 1 + threshold and elapsed - baseline > REGRESSION_SLACK
+            line += f" (基準 {baseline * 1000:.2f}ms, x{ratio:.2f}{', 遅延' if regressed else ''})"
+            ok = ok and not regressed
+        print(line)
+    if update_baselines:
+        save_baselines(results)
+        print(f"基準値を {BASELINE_PATH} に保存しました")
+    elif not baselines:
+        print("基準値がありません (--update-baselines で作成)")
+    return ok
+
+
+CHECKS = {
+    "parse-scaling": check_parse_scaling,
+    "import-time": check_import_time,
+    "zeb-screening": check_zeb_screening,
+    "export-throughput": check_export_throughput,
+    "stages": check_stages,
+}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="性能計測")
+    parser.add_argument("checks", nargs="*", help=f"実行するチェック ({', '.join(CHECKS)}。省略時は全て)")
+    parser.add_argument("--update-baselines", action="store_true", help="stages の計測値を基準値として保存する")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="stages で失敗とする基準値からの遅延の割合")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"不明なチェック: {', '.join(unknown)}")
+    failed = []
+    for name in args.checks or list(CHECKS):
+        if name == "stages":
+            passed = check_stages(args.update_baselines, args.threshold)
+        else:
+            passed = CHECKS[name]()
+        if not passed:
+            failed.append(name)
+    for name in failed:
+        print(f"FAILED: {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
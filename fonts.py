@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日本語フォントの解決
+フォントファイルを1度だけ探して FontProperties を使い回す
+python -m fonts  でmatplotlibのフォントキャッシュを作成しておく (コンテナのビルド時など)
+"""
+
+import os
+import threading
+
+# packages.txt で入るフォントの既定の配置 (先にあるものを優先、IPAは代替)
+CJK_FONT_FILES = [
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJKjp-Regular.otf',
+    '/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf',
+    '/usr/share/fonts/truetype/fonts-japanese-gothic.ttf',
+    '/usr/share/fonts/opentype/ipafont-mincho/ipam.ttf',
+]
+# 上記に無い場合にmatplotlibのフォント一覧から探すファミリー名
+CJK_FONT_FAMILIES = ['Noto Sans CJK JP', 'IPAGothic', 'IPAPGothic', 'IPAMincho']
+
+_UNRESOLVED = object()
+_font_file = _UNRESOLVED
+_properties = {}
+_lock = threading.Lock()
+
+
+def find_cjk_font_file():
+    """
+    日本語フォントのファイルパス (見つからない場合は None)
+    環境変数 ONE_BUILDING_FONT_PATH で指定することもできる
+    """
+    global _font_file
+    if _font_file is not _UNRESOLVED:
+        return _font_file
+    with _lock:
+        if _font_file is _UNRESOLVED:
+            _font_file = _search_font_file()
+    return _font_file
+
+
+def _search_font_file():
+    candidates = [os.environ.get('ONE_BUILDING_FONT_PATH')] + CJK_FONT_FILES
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    # 作成済みのフォント一覧から探す (フォントディレクトリの再走査はしない)
+    from matplotlib import font_manager
+    for family in CJK_FONT_FAMILIES:
+        try:
+            return font_manager.fontManager.findfont(
+                font_manager.FontProperties(family=family), fallback_to_default=False, rebuild_if_missing=False)
+        except ValueError:
+            continue
+    print("warning: 日本語フォントが見つかりません (packages.txt のフォントをインストールしてください)")
+    return None
+
+
+def get_font_properties(size=None):
+    """
+    日本語フォントの FontProperties (サイズごとに1つを共有する)
+    """
+    properties = _properties.get(size)
+    if properties is None:
+        from matplotlib.font_manager import FontProperties
+        path = find_cjk_font_file()
+        properties = FontProperties(fname=path, size=size) if path else FontProperties(size=size)
+        with _lock:
+            properties = _properties.setdefault(size, properties)
+    return properties
+
+
+def configure_matplotlib(matplotlib):
+    """
+    見つかったフォントを登録し、既定のフォントにする
+    """
+    path = find_cjk_font_file()
+    if path is None:
+        return
+    from matplotlib import font_manager
+    font_manager.fontManager.addfont(path)
+    name = get_font_properties().get_name()
+    matplotlib.rcParams["font.family"] = name
+    matplotlib.rcParams["font.sans-serif"] = [name]
+
+
+def warm_up():
+    """
+    フォントキャッシュの作成とフォントの解決を先に済ませる
+    """
+    import matplotlib.font_manager  # 読み込み時にフォントキャッシュが作られる (初回のみ時間がかかる)
+    return find_cjk_font_file()
+
+
+if __name__ == "__main__":
+    path = warm_up()
+    if path:
+        print(path)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTMLテンプレートモジュール
+templates/ 以下のファイルを1度だけ読み込んで固定部分と差し込み位置に分割し、
+描画時は値を差し込んで連結するだけにする
+
+書式:
+  {{ name }}       値を文字列化し、HTMLエスケープして差し込む
+  {{ name|safe }}  エスケープせずに差し込む (SVGなど生成済みのマークアップ用)
+"""
+
+import html
+import os
+import re
+import threading
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+_PLACEHOLDER_RE = re.compile(r'\{\{\s*(\w+)\s*(\|\s*safe\s*)?\}\}')
+
+
+class CompiledTemplate:
+    """
+    固定部分と差し込み位置に分割済みのテンプレート
+    """
+
+    def __init__(self, source):
+        segments = []
+        slots = []
+        pos = 0
+        for match in _PLACEHOLDER_RE.finditer(source):
+            segments.append(source[pos:match.start()])
+            slots.append((len(segments), match.group(1), bool(match.group(2))))
+            segments.append(None)
+            pos = match.end()
+        segments.append(source[pos:])
+        self.segments = segments
+        self.slots = slots
+        self.names = frozenset(name for _, name, _ in slots)
+
+    def render(self, context):
+        """
+        値を差し込んだ文字列 (context に無い名前は KeyError)
+        """
+        parts = list(self.segments)
+        escape = html.escape
+        for index, name, safe in self.slots:
+            value = context[name]
+            parts[index] = str(value) if safe else escape(str(value))
+        return ''.join(parts)
+
+
+_TEMPLATES = {}
+_LOCK = threading.Lock()
+
+def load_template(name):
+    """
+    テンプレートを読み込んで分割する (プロセスごとに1回)
+    """
+    template = _TEMPLATES.get(name)
+    if template is None:
+        with open(os.path.join(TEMPLATE_DIR, name), encoding='utf-8') as f:
+            template = CompiledTemplate(f.read())
+        with _LOCK:
+            template = _TEMPLATES.setdefault(name, template)
+    return template
+
+def clear_template_cache():
+    """
+    読み込み済みのテンプレートを破棄する (テンプレートを編集した後に呼ぶ)
+    """
+    with _LOCK:
+        _TEMPLATES.clear()
+
+def render_template(name, context):
+    return load_template(name).render(context)
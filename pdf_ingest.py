@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF読み込みモジュール
+計算結果のPDFからページごとに表を取り出し、extract_data_from_markdown が読めるMarkdownに変換する
+"""
+
+import hashlib
+import io
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import stat
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+# 並列で処理するページ数の下限 (これより少ない場合はプロセスを起動せずに処理する)
+PARALLEL_MIN_PAGES = 8
+# ページの取り出し方を変えたら上げる (キャッシュ済みのページを無効にする)
+PAGE_CACHE_VERSION = 2
+
+_NUMBERED_LABEL_RE = re.compile(r'\(\d+\)\s*')
+_CODE_RE = re.compile(r'[A-Z]+\d+$')
+
+
+def _open_pdf(buffer):
+    import pdfplumber
+    if isinstance(buffer, (bytes, bytearray, memoryview)):
+        return pdfplumber.open(io.BytesIO(buffer))
+    return pdfplumber.open(buffer)
+
+
+@contextmanager
+def _source_buffer(source):
+    """
+    PDFの内容 (ファイルはメモリマップで開き、ヒープに読み込まない) と、ファイルの場合はそのパス
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped, os.fspath(source)
+        return
+    if hasattr(source, 'read'):
+        # 呼び出し側の with 本体で起きた例外を拾わないよう、try で囲むのはメモリマップの作成だけにする
+        try:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            mapped = None
+        if mapped is not None:
+            with mapped:
+                yield mapped, getattr(source, 'name', None)
+            return
+        source = source.read()
+    yield source, None
+
+
+class PageCache:
+    """
+    ページごとの抽出結果をPDFの内容のハッシュで保存するディスクキャッシュ
+    directory/<ハッシュ>/<ページ番号>.json と、ページ数を directory/<ハッシュ>/pages に保存する
+    directory は自分だけが読み書きできる (0o700、所有者が自分) 場合にだけ使う
+    """
+
+    def __init__(self, directory, max_documents=256):
+        self.directory = directory
+        self.max_documents = max_documents
+        self._usable = None
+
+    def usable(self):
+        """
+        保存先を作成し (無ければ 0o700 で)、他のユーザーが書き込める場合は使わない
+        """
+        if self._usable is None:
+            try:
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)
+                st = os.lstat(self.directory)
+                self._usable = (stat.S_ISDIR(st.st_mode) and not st.st_mode & 0o077
+                                and (not hasattr(os, 'getuid') or st.st_uid == os.getuid()))
+            except OSError:
+                self._usable = False
+        return self._usable
+
+    def _document_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def _write(self, path, data):
+        # 途中まで書かれたファイルを読まないよう、一時ファイルから置き換える
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def page_count(self, key):
+        try:
+            with open(os.path.join(self._document_dir(key), 'pages')) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def put_page_count(self, key, count):
+        self._write(os.path.join(self._document_dir(key), 'pages'), str(count).encode())
+        self._evict()
+
+    def get(self, key, index):
+        try:
+            with open(os.path.join(self._document_dir(key), f'{index}.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, page):
+        self._write(os.path.join(self._document_dir(key), f"{page['index']}.json"),
+                    json.dumps(page, ensure_ascii=False).encode('utf-8'))
+
+    def _evict(self):
+        # 上限を超えた分は更新日時の古い文書から削除
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.is_dir()]
+        except OSError:
+            return
+        if len(entries) <= self.max_documents:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_documents]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _default_cache_directory():
+    # ユーザーごとのキャッシュディレクトリ (共有の一時ディレクトリは使わない)
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'one_building', 'pdf_pages')
+
+# 既定のキャッシュ (環境変数 ONE_BUILDING_PDF_CACHE でディレクトリを指定できる)
+_PAGE_CACHE = PageCache(os.environ.get('ONE_BUILDING_PDF_CACHE') or _default_cache_directory())
+
+def configure_page_cache(directory, max_documents=256):
+    """
+    ページキャッシュの保存先を変更する (None で無効)
+    """
+    global _PAGE_CACHE
+    _PAGE_CACHE = PageCache(directory, max_documents) if directory else None
+    return _PAGE_CACHE
+
+def get_page_cache():
+    return _PAGE_CACHE
+
+def document_key(buffer):
+    digest = hashlib.sha256(buffer)
+    digest.update(f':{PAGE_CACHE_VERSION}'.encode())
+    return digest.hexdigest()
+
+
+def _clean(cell):
+    # セル内の折り返し (縦書きの見出しを含む) は詰めて1行にする
+    return '' if cell is None else cell.replace('\n', '').strip()
+
+
+def extract_page(pdf, index):
+    """
+    1ページ分の表 (読み順に並べた行の一覧) と表の外側のテキスト
+    """
+    page = pdf.pages[index]
+    tables = page.find_tables()
+    # 2段組みのページは左の段から順に読む
+    tables.sort(key=lambda table: (table.bbox[0] >= page.width / 2, table.bbox[1]))
+    bboxes = [table.bbox for table in tables]
+
+    def outside(obj):
+        return not any(x0 <= obj['x0'] and obj['x1'] <= x1 and top <= obj['top'] and obj['bottom'] <= bottom
+                       for x0, top, x1, bottom in bboxes)
+
+    text = page.filter(lambda obj: obj.get('object_type') != 'char' or outside(obj)).extract_text() or ''
+    return {'index': index, 'text': text, 'tables': [table.extract() for table in tables]}
+
+
+def is_summary_page(page):
+    cells = ' '.join(_clean(cell) for table in page['tables'] for row in table for cell in row)
+    return '【BEI' in cells and 'BPI' in cells
+
+
+def is_input_page(page):
+    return '入力シートによる入力項目' in page['text']
+
+
+# ワーカープロセスごとに1回だけPDFを開く
+_worker_pdf = None
+
+def _init_worker(path):
+    global _worker_pdf
+    # メモリマップはファイル記述子を複製して持つため、ファイルはすぐに閉じてよい
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_pdf = _open_pdf(mapped)
+
+def _worker_context():
+    # 複数スレッドのプロセス (Streamlit のサーバなど) を fork すると、他のスレッドが持つロックで止まることがある
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def _extract_worker_page(index):
+    return extract_page(_worker_pdf, index)
+
+
+def iter_pages(source, workers=None):
+    """
+    ページを先頭から順に返す
+    キャッシュに無いページだけを取り出し (並列時は workers ページずつ)、取り出したページはキャッシュに保存する
+    """
+    cache = _PAGE_CACHE if _PAGE_CACHE is not None and _PAGE_CACHE.usable() else None
+    workers = workers or os.cpu_count() or 1
+    with _source_buffer(source) as (buffer, path):
+        key = document_key(buffer) if cache else None
+        count = cache.page_count(key) if cache else None
+        pdf = None
+        executor = None
+        spooled = None
+        try:
+            if count is None:
+                pdf = _open_pdf(buffer)
+                count = len(pdf.pages)
+                if cache:
+                    cache.put_page_count(key, count)
+            parallel = workers > 1 and count >= PARALLEL_MIN_PAGES
+            step = workers if parallel else 1
+            for start in range(0, count, step):
+                indexes = range(start, min(start + step, count))
+                pages = {index: cache.get(key, index) for index in indexes} if cache else {}
+                missing = [index for index in indexes if pages.get(index) is None]
+                if missing:
+                    if parallel:
+                        if executor is None:
+                            # ワーカーにはファイルのパスを渡す (ファイル以外は内容を一時ファイルに書き出す)
+                            if path is None:
+                                fd, spooled = tempfile.mkstemp(suffix='.pdf')
+                                with os.fdopen(fd, 'wb') as f:
+                                    f.write(buffer)
+                            executor = ProcessPoolExecutor(max_workers=workers, mp_context=_worker_context(),
+                                                           initializer=_init_worker, initargs=(path or spooled,))
+                        extracted = executor.map(_extract_worker_page, missing)
+                    else:
+                        pdf = pdf or _open_pdf(buffer)
+                        extracted = (extract_page(pdf, index) for index in missing)
+                    for page in extracted:
+                        if cache:
+                            cache.put(key, page)
+                        pages[page['index']] = page
+                # 呼び出し側が途中で止めた場合、残りのページは取り出さない
+                for index in indexes:
+                    yield pages[index]
+        finally:
+            if pdf is not None:
+                pdf.close()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            if spooled is not None:
+                os.remove(spooled)
+
+
+def select_pages(pages):
+    """
+    BEI/BPI の概要ページと入力項目のページだけを採り、それらを過ぎたら読み込みを止める
+    (概要が見つからない場合は全ページ)
+    """
+    selected = []
+    summary_found = False
+    for page in pages:
+        if is_summary_page(page) or is_input_page(page):
+            summary_found = summary_found or is_summary_page(page)
+            selected.append(page)
+        elif summary_found:
+            break
+        else:
+            selected.append(page)
+    return selected
+
+
+def _summary_table_lines(rows):
+    """
+    "(n) ラベル | 値" の行はラベルと値の2行に、その他は "| ラベル | 値" の表の行にする
+    (値が行末までになるよう閉じの "|" は付けない)
+    """
+    lines = []
+    labels = []
+    for row in rows:
+        cells = [_clean(cell) if cell is not None else None for cell in row]
+        if cells[0]:
+            # 1つのセルに複数のラベルがある場合 (【BEIm】と【誘導BEIm】) は続く行の値に順に対応させる
+            labels = [label.strip() for label in row[0].split('\n') if label.strip()]
+        values = [cell for cell in cells[1:] if cell]
+        if not labels or not values:
+            continue
+        label = labels.pop(0)
+        value = values[0]
+        if _NUMBERED_LABEL_RE.match(label):
+            if label.endswith('地域区分/年間日射地域区分') and '/' not in value:
+                # 概要ページには地域区分しか無い
+                value += ' /'
+            lines.extend([label, value, ''])
+        else:
+            lines.append(f'| {label} | {value}')
+    return lines
+
+
+def _input_table_lines(rows):
+    """
+    入力項目の表 (分類 | 室名 | コード | 項目 | 値) を見出しと "| コード | 項目 | 値 |" の行にする
+    """
+    lines = []
+    for row in rows:
+        group, room, code, item, value = (row + [None] * 5)[:5]
+        if group is not None and _clean(group):
+            lines.extend(['', f'### {_clean(group)}'])
+        if room is not None:
+            # 室名の無い区画も前の室と区別するため見出しを置く
+            lines.extend(['', f'**{_clean(room) or "-"}**'])
+        lines.append(f'| {_clean(code)} | {_clean(item)} | {_clean(value)} |')
+    return lines
+
+
+def _is_input_table(rows):
+    return bool(rows) and len(rows[0]) == 5 and all(_CODE_RE.match(_clean(row[2])) for row in rows)
+
+
+def page_to_markdown(page):
+    lines = page['text'].split('\n')
+    for rows in page['tables']:
+        lines.append('')
+        if _is_input_table(rows):
+            lines.extend(_input_table_lines(rows))
+        elif is_summary_page({'tables': [rows]}):
+            lines.extend(_summary_table_lines(rows))
+        else:
+            lines.extend('| ' + ' | '.join(_clean(cell) for cell in row) + ' |' for row in rows)
+    return '\n'.join(lines)
+
+
+def pdf_to_markdown(source, workers=None):
+    """
+    PDF (パス、ファイルオブジェクトまたはバイト列) をMarkdownに変換する
+    """
+    return '\n\n'.join(page_to_markdown(page) for page in select_pages(iter_pages(source, workers)))
+
+
+def pdf_cache_key(content):
+    """
+    PDFの内容のハッシュ
+    """
+    return 'pdf-' + hashlib.sha256(content).hexdigest()
+
+
+def extract_data_from_pdf(source, workers=None):
+    """
+    PDFからデータを抽出する
+    """
+    from report_generator import extract_data_from_markdown
+    return extract_data_from_markdown(pdf_to_markdown(source, workers))
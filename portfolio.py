@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ポートフォリオ (複数棟の抽出結果) の列指向データ
+1棟1行の DataFrame にまとめ、Parquet または Feather に保存する
+python -m portfolio "入力/*.md" [...] -o portfolio.parquet [-j 並列数]
+"""
+
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from report_model import as_report
+from zeb_rules import ZEB_RULES, evaluate_zeb_rules, report_value, rule_fields
+
+# 室ごとの制御の有無 (ZEB比較で判定するもの。"v7_機械室" は機械室のV7)
+CONTROL_COLUMNS = (['l4', 'l5', 'l6', 'l7']
+                   + [f'v7_{room}' for room in ('機械室', '便所', '駐車場', '厨房')]
+                   + [f'hw5_{room}' for room in ('洗面手洗い', '浴室', '厨房')])
+# 文字列の列 (値の種類が少ないものはカテゴリ型にする)
+TEXT_COLUMNS = ['building_name', 'location']
+CATEGORY_COLUMNS = ['region', 'solar_region', 'building_model', 'calculation_method', 'solar_pv', 'cgs',
+                    'judgment_base', 'judgment_large', 'judgment_target', 'ac1', 'ac7', 'ac13'] + CONTROL_COLUMNS
+# 数値の列 (数値でない値は NaN)
+NUMBER_COLUMNS = (['total_area', 'bei_total', 'bpi', 'bei_target', 'bei_ac', 'bei_v', 'bei_l', 'bei_hw', 'bei_ev']
+                  + [f'pal{n}' for n in range(6, 24)]
+                  + ['ac4', 'ac6', 'ac10', 'ac12'])
+# 単位付きで抽出される数値の列 ("353.00 [W/m2]" は先頭の数値を取る)
+UNIT_NUMBER_COLUMNS = ['ac4', 'ac10']
+COLUMNS = TEXT_COLUMNS + CATEGORY_COLUMNS + NUMBER_COLUMNS
+
+# 条件の接尾辞 (bei_ac__gt=1.5 のように指定する)
+_OPERATORS = {
+    'gt': np.greater,
+    'ge': np.greater_equal,
+    'lt': np.less,
+    'le': np.less_equal,
+    'eq': np.equal,
+    'ne': np.not_equal,
+}
+
+_LEADING_NUMBER_RE = re.compile(r'\s*([-+]?(?:\d[\d,]*(?:\.\d*)?|\.\d+))')
+
+
+def _text(value):
+    # 数値が入っていても文字列の列にそろえる (Parquet / Feather は型の混在した列を保存できない)
+    return None if value is None else str(value)
+
+
+def _leading_number(value):
+    if isinstance(value, str):
+        m = _LEADING_NUMBER_RE.match(value)
+        return float(m.group(1).replace(',', '')) if m else None
+    return value
+
+
+def _row(report):
+    envelope = report.envelope
+    equipment = report.equipment
+    row = {
+        'building_name': report.building_name,
+        'location': report.location,
+        'region': report.region,
+        'solar_region': report.solar_region,
+        'building_model': report.building_model,
+        'calculation_method': report.calculation_method,
+        'solar_pv': report.solar_pv,
+        'cgs': report.cgs,
+        'judgment_base': report.judgment.get('base'),
+        'judgment_large': report.judgment.get('large'),
+        'judgment_target': report.judgment.get('target'),
+        'total_area': report.total_area,
+        'bei_total': report.bei_total,
+        'bpi': report.bpi,
+        'bei_target': report.bei_target,
+        'bei_ac': report.bei_ac,
+        'bei_v': report.bei_v,
+        'bei_l': report.bei_l,
+        'bei_hw': report.bei_hw,
+        'bei_ev': report.bei_ev,
+    }
+    for n in range(6, 24):
+        row[f'pal{n}'] = getattr(envelope, f'pal{n}')
+    for n in (1, 4, 6, 7, 10, 12, 13):
+        row[f'ac{n}'] = getattr(equipment, f'ac{n}')
+    for name in CONTROL_COLUMNS:
+        row[name] = report_value(report, name)
+    return row
+
+
+def reports_to_frame(reports, sources=None):
+    """
+    抽出結果 (辞書または BuildingReport) の並びを1棟1行の DataFrame にする
+    sources を渡すと入力ファイル名などを source 列に入れる
+    """
+    rows = [_row(as_report(report)) for report in reports]
+    columns = {}
+    for name in TEXT_COLUMNS:
+        columns[name] = pd.Series([_text(row[name]) for row in rows], dtype=object)
+    for name in CATEGORY_COLUMNS:
+        columns[name] = pd.Categorical([_text(row[name]) for row in rows])
+    for name in NUMBER_COLUMNS:
+        values = [row[name] for row in rows]
+        if name in UNIT_NUMBER_COLUMNS:
+            values = [_leading_number(value) for value in values]
+        values = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+        columns[name] = values.astype('float64')
+    frame = pd.DataFrame(columns, columns=COLUMNS)
+    if sources is not None:
+        frame.insert(0, 'source', pd.Series(list(sources)))
+    return frame
+
+
+class Portfolio:
+    """
+    1棟1行の DataFrame (frame) と、それに対する列単位の検索
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    @classmethod
+    def from_reports(cls, reports, sources=None):
+        return cls(reports_to_frame(reports, sources))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def extend(self, reports, sources=None):
+        """
+        抽出結果を追加した Portfolio を返す
+        """
+        added = reports_to_frame(reports, sources)
+        frame = pd.concat([self.frame, added], ignore_index=True)
+        # 追加分で種類が増えたカテゴリ列は object になるため、カテゴリ型に戻す
+        for name in CATEGORY_COLUMNS:
+            if frame[name].dtype != 'category':
+                frame[name] = frame[name].astype('category')
+        return Portfolio(frame)
+
+    def mask(self, building_model=None, **conditions):
+        """
+        条件に合う行の真偽値の配列
+        building_model はモデル建物名の部分一致 (例: "ホテル")、
+        その他は 列名__gt=値 (gt, ge, lt, le, eq, ne) または 列名=値 (一致)
+        """
+        frame = self.frame
+        selected = np.ones(len(frame), dtype=bool)
+        if building_model is not None:
+            # 比較はカテゴリの種類ごとに1回だけ行い、行はカテゴリの番号で選ぶ
+            models = frame['building_model'].cat
+            matched = [i for i, name in enumerate(models.categories) if building_model in name]
+            selected &= np.isin(models.codes, matched)
+        for key, value in conditions.items():
+            name, _, operator = key.partition('__')
+            if name not in frame.columns:
+                raise KeyError(f"unknown column: {name}")
+            if operator and operator not in _OPERATORS:
+                raise ValueError(f"unknown operator: {operator}")
+            column = frame[name]
+            if column.dtype == 'category':
+                column = column.astype(object)
+            selected &= np.asarray(_OPERATORS[operator or 'eq'](column.to_numpy(), value), dtype=bool)
+        return selected
+
+    def select(self, building_model=None, **conditions):
+        """
+        条件に合う行の DataFrame (例: select(building_model="ホテル", bei_ac__gt=1.5))
+        """
+        return self.frame[self.mask(building_model, **conditions)]
+
+    def zeb_screening(self, rules=None):
+        """
+        全棟にZEB比較のルールを適用し、(棟 × ルール) の判定 (True: 良好) の DataFrame と
+        ルールごとの達成率の Series を返す
+        """
+        rules = rules or ZEB_RULES
+        columns = {name: self.frame[name].to_numpy() for name in rule_fields(rules)}
+        passed, pass_rates = evaluate_zeb_rules(columns, rules)
+        categories = [rule.category for rule in rules]
+        return (pd.DataFrame(passed, index=self.frame.index, columns=categories),
+                pd.Series(pass_rates, index=categories))
+
+    def save(self, path):
+        """
+        拡張子に応じて Parquet (.parquet) または Feather (.feather / .arrow) で保存する
+        Feather はメモリマップで読めるよう圧縮しない
+        """
+        if _is_feather(path):
+            self.frame.to_feather(path, compression='uncompressed')
+        else:
+            self.frame.to_parquet(path, index=False)
+
+    @classmethod
+    def load(cls, path, memory_map=True):
+        """
+        save で保存したファイルを読み込む (memory_map=True ではファイルをメモリマップで開く)
+        """
+        if _is_feather(path):
+            from pyarrow import feather
+            table = feather.read_table(path, memory_map=memory_map)
+            # 欠損の無い数値列はメモリマップした領域をそのまま使う
+            return cls(table.to_pandas(split_blocks=True))
+        return cls(pd.read_parquet(path, memory_map=memory_map))
+
+
+def _is_feather(path):
+    return os.path.splitext(os.fspath(path))[1].lower() in ('.feather', '.arrow')
+
+
+def _extract_file(path):
+    from report_generator import extract_data_from_stream
+    try:
+        with open(path, "rb") as f:
+            return path, extract_data_from_stream(f), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def build_portfolio(paths, jobs=None, chunksize=16):
+    """
+    ファイルを並列に解析して Portfolio と、失敗したファイルの (パス, エラー) の一覧を返す
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(_extract_file, paths, chunksize=max(1, chunksize)))
+    parsed = [(path, data) for path, data, error in results if error is None]
+    failed = [(path, error) for path, _, error in results if error is not None]
+    portfolio = Portfolio.from_reports([data for _, data in parsed], sources=[path for path, _ in parsed])
+    return portfolio, failed
+
+
+def main(argv=None):
+    from batch_report import expand_inputs
+    parser = argparse.ArgumentParser(description="Markdownの計算結果をまとめて Parquet / Feather に保存する")
+    parser.add_argument("inputs", nargs="+", help="入力ファイルまたは glob パターン")
+    parser.add_argument("-o", "--output", required=True, help="出力ファイル (.parquet / .feather)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="並列数 (既定はCPU数)")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("入力ファイルが見つかりません", file=sys.stderr)
+        return 2
+    portfolio, failed = build_portfolio(paths, args.jobs)
+    portfolio.save(args.output)
+    print(f"{len(portfolio)}/{len(paths)} 棟を {args.output} に保存")
+    for path, error in failed:
+        print(f"失敗: {path}: {error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,16 +6,46 @@
 """
 
 import re
-import pandas as pd
-import numpy as np
+import codecs
+import copy
+import hashlib
+import math
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import namedtuple, OrderedDict
 import io
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use("Agg")
 
-# 日本語フォントの設定
-matplotlib.rcParams["font.family"] = "Noto Sans CJK JP"
-matplotlib.rcParams["font.sans-serif"] = ["Noto Sans CJK JP"]
+from report_model import BuildingReport, as_report
+from tracing import span
+
+# matplotlib は描画時まで読み込まない (起動時間の短縮)
+_MATPLOTLIB = None
+
+def _matplotlib():
+    """
+    matplotlib を初回使用時に読み込み、Aggバックエンドと日本語フォントを設定する
+    """
+    global _MATPLOTLIB
+    if _MATPLOTLIB is None:
+        import matplotlib
+        from fonts import configure_matplotlib
+        matplotlib.use("Agg")
+        # 日本語フォントの設定
+        configure_matplotlib(matplotlib)
+        _MATPLOTLIB = matplotlib
+    return _MATPLOTLIB
+
+def _figure_classes():
+    """
+    (Figure, FigureCanvasAgg)
+    """
+    _matplotlib()
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    return Figure, FigureCanvasAgg
 
 # カラー定義
 COLOR_MAIN = "#397577"
@@ -24,81 +54,307 @@ COLOR_GREEN = "#2a9d8f"
 COLOR_ACCENT = "#F4A261"
 COLOR_GRAY = "#999999"
 
-def extract_data_from_markdown(content):
+# 数値または文字列に変換
+def _to_float_or_str(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return value
+
+def _strip_to_float_or_str(value):
+    return _to_float_or_str(value.strip())
+
+def _to_area(value):
+    return float(value.replace(',', ''))
+
+def _model_building(value):
+    return 'model_building'
+
+# 抽出ルール
+#   field: 格納先のキー ("envelope_details.PAL6" のように "." で入れ子を表す)
+#   kind: 'block'  … 行末のラベルの次の非空行が値
+#         'inline' … ラベルに続く同じ行の残りが値 (空なら次の非空行)
+#         'cell'   … 表のセル末尾のラベルに続く "|" 以降が値
+#   labels: ラベル表記 (ラベル中の空白は任意個の空白に一致)
+#   pattern: 値テキストに適用するコンパイル済み正規表現 (最初のグループが値、None ならラベル自体)
+#   converter: 値の変換関数
+#   default: 既定値 (None の場合は見つかった時のみ格納)
+ExtractionRule = namedtuple('ExtractionRule', ['field', 'kind', 'labels', 'pattern', 'converter', 'default'])
+
+# 見出し(**室名**)から次の見出しまでの区画に codes の順で現れる "| コード | 項目 | 値 |" 行 → equipment_details[key]
+#   heading が None の場合は見出しを問わず、いずれか1つの区画で揃ったものを採る
+SectionRule = namedtuple('SectionRule', ['key', 'heading', 'codes'])
+
+_LINE_RE = re.compile(r'\s*(.*)')
+_AREA_RE = re.compile(r'([\d,.]+)')
+_REGION_RE = re.compile(r'(.*)/.*')
+_SOLAR_REGION_RE = re.compile(r'.*/(.*)')
+_NUMBER_RE = re.compile(r'\s*([\d.]+)')
+_DETAIL_NUMBER_RE = re.compile(r'[^|]*\|\s*([\d.]+)')
+_DETAIL_TEXT_RE = re.compile(r'[^|]*\|\s*([^|]*)')
+# 見出し行 ("### 換気" / "**機械室**")
+_HEADING_RE = re.compile(r'\s*(?:#+(.*)|\*\*([^*]+)\*\*\s*$)')
+
+EXTRACTION_RULES = [
+    # 基本情報
+    ExtractionRule('building_name', 'block', ('建築物の名称',), _LINE_RE, str.strip, '不明'),
+    ExtractionRule('total_area', 'block', ('床面積',), _AREA_RE, _to_area, 0.0),
+    ExtractionRule('location', 'inline', ('所在地:', '所在地：'), _LINE_RE, str.strip, '不明'),
+    ExtractionRule('region', 'block', ('地域区分/年間日射地域区分',), _REGION_RE, str.strip, '不明'),
+    ExtractionRule('solar_region', 'block', ('地域区分/年間日射地域区分',), _SOLAR_REGION_RE, str.strip, '不明'),
+    ExtractionRule('building_model', 'block', ('モデル建物',), _LINE_RE, str.strip, '不明'),
+    ExtractionRule('calculation_method', 'inline', ('モデル建物法',), None, _model_building, 'standard_input'),
+    # BEI/BPI
+    ExtractionRule('bei_total', 'cell', ('一次エネルギー消費量 【BEI】', '一次エネルギー消費量 【BEIm】'), _NUMBER_RE, float, 1.0),
+    ExtractionRule('bpi', 'cell', ('年間熱負荷係数 【BPI】', '年間熱負荷係数 【BPIm】'), _NUMBER_RE, float, 1.0),
+    ExtractionRule('bei_target', 'cell', ('【誘導BEIm】',), _NUMBER_RE, float, None),
+    # 設備別BEI
+    ExtractionRule('bei_ac', 'cell', ('空気調和設備 【BEI/AC】', '空気調和設備 【BEIm/AC】'), _NUMBER_RE, float, 1.0),
+    ExtractionRule('bei_v', 'cell', ('機械換気設備 【BEI/V】', '機械換気設備 【BEIm/V】'), _NUMBER_RE, float, 1.0),
+    ExtractionRule('bei_l', 'cell', ('照明設備 【BEI/L】', '照明設備 【BEIm/L】'), _NUMBER_RE, float, 1.0),
+    ExtractionRule('bei_hw', 'cell', ('給湯設備 【BEI/HW】', '給湯設備 【BEIm/HW】'), _NUMBER_RE, float, 1.0),
+    ExtractionRule('bei_ev', 'cell', ('昇降機 【BEI/EV】', '昇降機 【BEIm/EV】'), _NUMBER_RE, float, 1.0),
+    ExtractionRule('solar_pv', 'cell', ('太陽光発電',), _LINE_RE, str.strip, 'なし'),
+    ExtractionRule('cgs', 'cell', ('コージェネレーション設備',), _LINE_RE, str.strip, 'なし'),
+]
+# モデル建物法詳細項目の抽出 (PAL6-23)
+EXTRACTION_RULES += [
+    ExtractionRule(f'envelope_details.PAL{code}', 'cell', (f'PAL{code}',), _DETAIL_NUMBER_RE, _to_float_or_str, None)
+    for code in range(6, 24)
+]
+# 空調詳細 (AC1, AC4, AC6, AC7, AC10, AC12, AC13)
+EXTRACTION_RULES += [
+    ExtractionRule(f'equipment_details.AC{code}', 'cell', (f'AC{code}',), _DETAIL_TEXT_RE, _strip_to_float_or_str, None)
+    for code in [1, 4, 6, 7, 10, 12, 13]
+]
+
+SECTION_RULES = [
+    # 換気 (V5-7)
+    SectionRule('V_機械室', '機械室', ('V5', 'V6', 'V7')),
+    SectionRule('V_便所', '便所', ('V5', 'V6', 'V7')),
+    SectionRule('V_駐車場', '駐車場', ('V5', 'V6', 'V7')),
+    SectionRule('V_厨房', '厨房', ('V5', 'V6', 'V7')),
+    # 照明 (L4-7)
+    SectionRule('L', None, ('L4', 'L5', 'L6', 'L7')),
+    # 給湯 (HW4-5)
+    SectionRule('HW_洗面手洗い', '洗面手洗い', ('HW4', 'HW5')),
+    SectionRule('HW_浴室', '浴室', ('HW4', 'HW5')),
+    SectionRule('HW_厨房', '厨房', ('HW4', 'HW5')),
+]
+
+
+# 概要の指標 (計算結果の冒頭にあり、アプリが最初に表示する値)
+SUMMARY_FIELDS = ('building_name', 'total_area', 'bei_total', 'bpi')
+
+
+def _label_regex(label):
+    # ラベル中の空白は任意個の空白に一致させる
+    return r'\s*'.join(re.escape(part) for part in label.split())
+
+def _label_key(label):
+    return ''.join(label.split())
+
+def _alternation(patterns):
+    # 長いものを先に試し、短いラベルが前方一致で優先されないようにする
+    return '|'.join(sorted(set(patterns), key=len, reverse=True))
+
+def _compile_rules():
     """
-    Markdownからデータを抽出する
+    ルール一覧から種類ごとのコンパイル済み正規表現と索引を作る
+    """
+    global _CELL_RE, _BLOCK_RE, _INLINE_RE, _CODE_ROW_RE
+    global _RULES_BY_LABEL, _RULE_FIELDS, _BLOCK_TAILS, _RULES_FINGERPRINT
+    rules_by_label = {}
+    labels = {'cell': [], 'block': [], 'inline': []}
+    for rule in EXTRACTION_RULES:
+        for label in rule.labels:
+            rules_by_label.setdefault((rule.kind, _label_key(label)), []).append(rule)
+            labels[rule.kind].append(_label_regex(label))
+    codes = []
+    for rule in SECTION_RULES:
+        codes.extend(re.escape(code) for code in rule.codes)
+
+    # 該当するラベルが無い種類は何にも一致しないパターンにする
+    def compile_alternation(template, patterns):
+        return re.compile(template % _alternation(patterns) if patterns else r'(?!)')
+
+    _CELL_RE = compile_alternation(r'(%s)\s*\|', labels['cell'])
+    _BLOCK_RE = compile_alternation(r'(%s)\s*$', labels['block'])
+    _INLINE_RE = compile_alternation(r'(%s)', labels['inline'])
+    _CODE_ROW_RE = compile_alternation(r'\| (%s) \|', codes)
+    # 行末の文字で絞り込んでから行末ラベルの正規表現を適用する
+    _BLOCK_TAILS = frozenset(label[-1] for rule in EXTRACTION_RULES
+                             if rule.kind == 'block' for label in rule.labels)
+    _RULES_BY_LABEL = rules_by_label
+    _RULE_FIELDS = {rule.field for rule in EXTRACTION_RULES}
+    _RULES_FINGERPRINT = None
+
+_compile_rules()
+
+
+def register_rule(rule):
     """
-    data = {
-        'building_name': '不明',
-        'total_area': 0.0,
-        'location': '不明',
-        'region': '不明',
-        'solar_region': '不明',
-        'building_model': '不明',
-        'calculation_method': 'standard_input',
-        'bei_total': 1.0,
-        'bpi': 1.0,
-        'bei_ac': 1.0,
-        'bei_v': 1.0,
-        'bei_l': 1.0,
-        'bei_hw': 1.0,
-        'bei_ev': 1.0,
-        'solar_pv': 'なし',
-        'cgs': 'なし',
+    抽出ルールを追加する (extract_data_from_markdown を編集せずに抽出項目を増やす)
+    """
+    EXTRACTION_RULES.append(rule)
+    _compile_rules()
+
+def register_section_rule(rule):
+    """
+    見出し単位の抽出ルールを追加する
+    """
+    SECTION_RULES.append(rule)
+    _compile_rules()
+
+
+def _new_report_data():
+    """
+    抽出結果の初期値
+    """
+    data = {}
+    for rule in EXTRACTION_RULES:
+        if rule.default is not None and '.' not in rule.field:
+            data.setdefault(rule.field, rule.default)
+    data.update({
         'judgment': {},
         'envelope_details': {},
         'equipment_details': {},
         'energy_consumption': {}
-    }
+    })
+    for rule in EXTRACTION_RULES:
+        if rule.default is not None and '.' in rule.field:
+            group, key = rule.field.split('.', 1)
+            data.setdefault(group, {})[key] = rule.default
+    return data
 
-    # モデル建物法かどうかの判定
-    if "モデル建物法" in content:
-        data['calculation_method'] = 'model_building'
-
-    # 基本情報の抽出
-    m = re.search(r'建築物の名称\s*\n\s*(.*)', content)
-    if m: data['building_name'] = m.group(1).strip()
-    
-    m = re.search(r'床面積\s*\n\s*([\d,.]+)', content)
-    if m: data['total_area'] = float(m.group(1).replace(',', ''))
-    
-    m = re.search(r'所在地[:：]\s*(.*)', content)
-    if m: data['location'] = m.group(1).strip()
-
-    m = re.search(r'地域区分/年間日射地域区分\s*\n\s*(.*)/(.*)', content)
-    if m:
-        data['region'] = m.group(1).strip()
-        data['solar_region'] = m.group(2).strip()
-
-    m = re.search(r'モデル建物\s*\n\s*(.*)', content)
-    if m: data['building_model'] = m.group(1).strip()
-
-    # BEI/BPIの抽出
-    m = re.search(r'年間熱負荷係数\s*【BPIm?】\s*\|\s*([\d.]+)', content)
-    if m: data['bpi'] = float(m.group(1))
-    
-    m = re.search(r'一次エネルギー消費量\s*【BEIm?】\s*\|\s*([\d.]+)', content)
-    if m: data['bei_total'] = float(m.group(1))
-
-    m = re.search(r'【誘導BEIm】\s*\|\s*([\d.]+)', content)
-    if m: data['bei_target'] = float(m.group(1))
 
-    # 設備別BEI
-    m = re.search(r'空気調和設備\s*【BEIm?/AC】\s*\|\s*([\d.]+)', content)
-    if m: data['bei_ac'] = float(m.group(1))
-    m = re.search(r'機械換気設備\s*【BEIm?/V】\s*\|\s*([\d.]+)', content)
-    if m: data['bei_v'] = float(m.group(1))
-    m = re.search(r'照明設備\s*【BEIm?/L】\s*\|\s*([\d.]+)', content)
-    if m: data['bei_l'] = float(m.group(1))
-    m = re.search(r'給湯設備\s*【BEIm?/HW】\s*\|\s*([\d.]+)', content)
-    if m: data['bei_hw'] = float(m.group(1))
-    m = re.search(r'昇降機\s*【BEIm?/EV】\s*\|\s*([\d.]+)', content)
-    if m: data['bei_ev'] = float(m.group(1))
-
-    m = re.search(r'太陽光発電\s*\|\s*(.*)', content)
-    if m: data['solar_pv'] = m.group(1).strip()
-    m = re.search(r'コージェネレーション設備\s*\|\s*(.*)', content)
-    if m: data['cgs'] = m.group(1).strip()
+class _MarkdownScanner:
+    """
+    文書を1行ずつ1回だけ走査し、見出し・キー/値ブロック・表の行に分けて各ルールへ振り分ける
+    """
+
+    def __init__(self, data, fields=None):
+        self.data = data
+        # 揃った時点で走査を止める項目 (None の場合は全ルール)
+        self.fields = None if fields is None else frozenset(fields)
+        self.values = {}
+        # 次の非空行を待っているルール (直前の行で見つかったもの / 改行を挟んだもの)
+        self.pending_new = []
+        self.pending = []
+        self.sections = {}
+        self.chains = []
+        self._open_section(None)
+
+    def complete(self):
+        if self.fields is not None:
+            return self.fields.issubset(self.values)
+        # 全ルールが一致していれば、以降の行を読む必要はない
+        # (calculation_method はモデル建物法の文書でしか一致しないため、標準入力法の文書では成り立たない)
+        return (len(self.values) == len(_RULE_FIELDS)
+                and len(self.sections) == len(SECTION_RULES)
+                and not self.pending and not self.pending_new)
+
+    def feed(self, line):
+        if self.pending_new:
+            self.pending.extend(self.pending_new)
+            self.pending_new = []
+        if self.pending:
+            stripped = line.strip()
+            if stripped:
+                pending, self.pending = self.pending, []
+                for rule in pending:
+                    self._apply(rule, stripped)
+
+        for m in _INLINE_RE.finditer(line):
+            self._label('inline', m, line)
+        if line.rstrip()[-1:] in _BLOCK_TAILS:
+            m = _BLOCK_RE.search(line)
+            if m:
+                self._label('block', m, line)
+        if line.lstrip().startswith(('#', '**')):
+            m = _HEADING_RE.match(line)
+            if m:
+                # "#" だけの行は見出し名が空の区画の区切りとする
+                name = m.group(1) if m.group(1) is not None else m.group(2)
+                self._open_section(name.strip(' *'))
+        if '|' in line:
+            for m in _CELL_RE.finditer(line):
+                self._label('cell', m, line)
+            if self.chains:
+                for m in _CODE_ROW_RE.finditer(line):
+                    self._code_row(m.group(1), line, m.end())
+
+    def _label(self, kind, m, line):
+        label = m.group(1)
+        for rule in _RULES_BY_LABEL[(kind, _label_key(label))]:
+            if rule.field in self.values:
+                continue
+            if rule.pattern is None:
+                self.values[rule.field] = rule.converter(label)
+            elif kind == 'block':
+                self.pending_new.append(rule)
+            elif kind == 'inline' and not line[m.end():].strip():
+                self.pending.append(rule)
+            else:
+                self._apply(rule, line[m.end():])
+
+    def close(self):
+        # 文末まで値が現れなかったラベルは空文字を値とする
+        for rule in self.pending:
+            self._apply(rule, '')
+        self.pending = []
+
+    def _apply(self, rule, text):
+        if rule.field in self.values:
+            return
+        m = rule.pattern.match(text)
+        if m:
+            self.values[rule.field] = rule.converter(m.group(1))
+
+    def _open_section(self, name):
+        # 区画は次の見出しまで。前の区画で揃わなかった行は捨て、未確定のルールだけを新しい区画で探す
+        self.chains = [[rule, 0, {}] for rule in SECTION_RULES
+                       if rule.key not in self.sections and rule.heading in (None, name)]
+
+    def _code_row(self, code, line, pos):
+        # "| コード |" に続く "項目 | 値 |" の値セル
+        cells = line[pos:].split('|', 2)
+        if len(cells) < 3:
+            return
+        for chain in self.chains:
+            rule, index, values = chain
+            if index < len(rule.codes) and rule.codes[index] == code:
+                values[code] = cells[1].strip()
+                chain[1] = index + 1
+                if chain[1] == len(rule.codes):
+                    self.sections.setdefault(rule.key, values)
+
+    def result(self):
+        data = self.data
+        for rule in EXTRACTION_RULES:
+            if rule.field in self.values:
+                if '.' in rule.field:
+                    group, key = rule.field.split('.', 1)
+                    data.setdefault(group, {})[key] = self.values[rule.field]
+                else:
+                    data[rule.field] = self.values[rule.field]
+        for rule in SECTION_RULES:
+            if rule.key in self.sections:
+                data['equipment_details'][rule.key] = self.sections[rule.key]
+        return data
+
+
+def _extract_from_lines(lines, fields=None):
+    data = _new_report_data()
+
+    # 文書を1回だけ走査して各項目を抽出
+    scanner = _MarkdownScanner(data, fields)
+    for line in lines:
+        if scanner.complete():
+            break
+        scanner.feed(line)
+    scanner.close()
+    scanner.result()
 
     # 判定結果
     data['judgment'] = {
@@ -107,266 +363,444 @@ def extract_data_from_markdown(content):
         'target': '達成' if data.get('bei_target', 1.0) <= 0.6 else '非達成'
     }
 
-    # 数値変換を試みるヘルパー関数
-    def to_float_or_str(value):
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return value
+    return data
 
-    # モデル建物法詳細項目の抽出 (PAL6-23)
-    for code in range(6, 24):
-        pattern = rf'PAL{code}\s*\|\s*[^|]*\|\s*([\d.]+)'
-        m = re.search(pattern, content)
-        if m: data['envelope_details'][f'PAL{code}'] = to_float_or_str(m.group(1))
+def extract_data_from_markdown(content):
+    """
+    Markdownからデータを抽出する
+    """
+    with span('parse', chars=len(content)):
+        return _extract_from_lines(content.split('\n'))
 
-    # 空調詳細 (AC1, AC4, AC6, AC7, AC10, AC12, AC13)
-    for code in [1, 4, 6, 7, 10, 12, 13]:
-        pattern = rf'AC{code}\s*\|\s*[^|]*\|\s*([^|\n]*)'
-        m = re.search(pattern, content)
-        if m: data['equipment_details'][f'AC{code}'] = to_float_or_str(m.group(1).strip())
+def extract_report_from_markdown(content):
+    """
+    Markdownからデータを抽出し、BuildingReport として返す
+    """
+    return BuildingReport.from_dict(extract_data_from_markdown(content))
 
-    # 換気 (V5-7)
-    v_sections = [("機械室", "V_機械室"), ("便所", "V_便所"), ("駐車場", "V_駐車場"), ("厨房", "V_厨房")]
-    for section_name, key_name in v_sections:
-        section_pattern = rf'\*\*{section_name}\*\*\n.*?\| V5 \|.*?\| ([^|\n]*) \|.*?\| V6 \|.*?\| ([^|\n]*) \|.*?\| V7 \|.*?\| ([^|\n]*) \|'
-        m = re.search(section_pattern, content, re.DOTALL)
-        if m:
-            data['equipment_details'][key_name] = {
-                'V5': m.group(1).strip(),
-                'V6': m.group(2).strip(),
-                'V7': m.group(3).strip()
-            }
+def _iter_stream_lines(fp, encoding, chunk_size):
+    """
+    ファイルオブジェクト (またはチャンクの反復) から str.split('\n') と同じ区切りで行を順に返す
+    """
+    if hasattr(fp, 'read'):
+        chunks = iter(lambda: fp.read(chunk_size), fp.read(0))
+    else:
+        chunks = iter(fp)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    partial = []
+    for chunk in chunks:
+        if not isinstance(chunk, str):
+            chunk = decoder.decode(chunk)
+        lines = chunk.split('\n')
+        if len(lines) > 1:
+            partial.append(lines[0])
+            yield ''.join(partial)
+            yield from lines[1:-1]
+            partial = []
+        partial.append(lines[-1])
+    partial.append(decoder.decode(b'', final=True))
+    yield ''.join(partial)
 
-    # 照明 (L4-7)
-    l_pattern = r'\| L4 \|.*?\| ([^|\n]*) \|.*?\| L5 \|.*?\| ([^|\n]*) \|.*?\| L6 \|.*?\| ([^|\n]*) \|.*?\| L7 \|.*?\| ([^|\n]*) \|'
-    m = re.search(l_pattern, content, re.DOTALL)
-    if m:
-        data['equipment_details']['L'] = {
-            'L4': m.group(1).strip(),
-            'L5': m.group(2).strip(),
-            'L6': m.group(3).strip(),
-            'L7': m.group(4).strip()
-        }
+def extract_data_from_stream(fp, encoding='utf-8', chunk_size=64 * 1024, fields=None):
+    """
+    ファイルオブジェクト (バイナリ/テキスト) またはバイト列・文字列チャンクの反復からデータを抽出する
+    全体をメモリに読み込まず、チャンクごとに読み進める
+    fields (例: SUMMARY_FIELDS) を渡すと、それらの値が揃った時点で読み込みを止める (以降の項目は既定値のまま)
+    一括処理 (batch_report / portfolio) 用。アプリはアップロード内容全体をキャッシュの鍵にするため使わない
+    """
+    if fields is not None:
+        unknown = set(fields) - _RULE_FIELDS
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    with span('parse', stream=True):
+        return _extract_from_lines(_iter_stream_lines(fp, encoding, chunk_size), fields)
 
-    # 給湯 (HW4-5)
-    hw_sections = [("洗面手洗い", "HW_洗面手洗い"), ("浴室", "HW_浴室"), ("厨房", "HW_厨房")]
-    for section_name, key_name in hw_sections:
-        section_pattern = rf'\*\*{section_name}\*\*\n.*?\| HW4 \|.*?\| ([^|\n]*) \|.*?\| HW5 \|.*?\| ([^|\n]*) \|'
-        m = re.search(section_pattern, content, re.DOTALL)
-        if m:
-            data['equipment_details'][key_name] = {
-                'HW4': m.group(1).strip(),
-                'HW5': m.group(2).strip()
+# 抽出処理の互換性が変わったら上げる (キャッシュ済みの結果を無効にする)
+PARSER_VERSION = 1
+
+def _rules_fingerprint():
+    """
+    抽出ルールの内容を表す文字列 (register_rule でルールが変わるとキャッシュの鍵も変わる)
+    """
+    global _RULES_FINGERPRINT
+    if _RULES_FINGERPRINT is not None:
+        return _RULES_FINGERPRINT
+    parts = [str(PARSER_VERSION)]
+    for rule in EXTRACTION_RULES:
+        parts.append(repr((rule.field, rule.kind, tuple(rule.labels),
+                           rule.pattern.pattern if rule.pattern is not None else None,
+                           getattr(rule.converter, '__qualname__', None), rule.default)))
+    for rule in SECTION_RULES:
+        parts.append(repr((rule.key, rule.heading, tuple(rule.codes))))
+    _RULES_FINGERPRINT = '\n'.join(parts)
+    return _RULES_FINGERPRINT
+
+def _normalize_content(content, encoding='utf-8'):
+    """
+    キャッシュの鍵に使う正規化済みテキスト (BOMを除き、改行をLFに揃える)
+    """
+    if hasattr(content, 'read'):
+        content = content.read()
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        content = bytes(content).decode(encoding)
+    return content.lstrip('\ufeff').replace('\r\n', '\n')
+
+def content_cache_key(content, encoding='utf-8'):
+    """
+    正規化した内容と抽出ルールのハッシュ
+    """
+    digest = hashlib.sha256()
+    digest.update(_rules_fingerprint().encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(_normalize_content(content, encoding).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    抽出結果のキャッシュ (メモリ上のLRUと、任意でSQLiteファイルによるディスク層)
+    """
+
+    def __init__(self, max_entries=128, disk_path=None, max_disk_entries=4096):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_path:
+            with self._connect() as conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS parse_cache ('
+                             'key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.disk_path, timeout=10)
+
+    def get(self, key):
+        """
+        キャッシュ済みの抽出結果のコピー (無ければ None)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._entries[key])
+        data = self._disk_get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data)
+        return copy.deepcopy(data)
+
+    def put(self, key, data):
+        data = copy.deepcopy(data)
+        with self._lock:
+            self._remember(key, data)
+        self._disk_put(key, data)
+
+    def _remember(self, key, data):
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key):
+        if not self.disk_path:
+            return None
+        with self._connect() as conn:
+            row = conn.execute('SELECT value FROM parse_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE parse_cache SET accessed = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def _disk_put(self, key, data):
+        if not self.disk_path:
+            return
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO parse_cache (key, value, accessed) VALUES (?, ?, ?)',
+                         (key, pickle.dumps(data, pickle.HIGHEST_PROTOCOL), time.time()))
+            # 上限を超えた分は最終アクセスが古いものから削除
+            conn.execute('DELETE FROM parse_cache WHERE key IN (SELECT key FROM parse_cache '
+                         'ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.max_disk_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM parse_cache')
+
+    def stats(self):
+        """
+        ヒット/ミス数と件数
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk_path': self.disk_path,
             }
 
-    return data
+
+_PARSE_CACHE = ParseCache()
+
+def configure_parse_cache(max_entries=128, disk_path=None, max_disk_entries=4096):
+    """
+    既定の抽出キャッシュを作り直す (disk_path を指定するとプロセス間・再起動後も共有される)
+    """
+    global _PARSE_CACHE
+    if disk_path:
+        os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+    _PARSE_CACHE = ParseCache(max_entries, disk_path, max_disk_entries)
+    return _PARSE_CACHE
+
+def get_parse_cache():
+    return _PARSE_CACHE
+
+def extract_data_cached(content, encoding='utf-8', cache=None):
+    """
+    extract_data_from_markdown のキャッシュ付き版 (文字列・バイト列・ファイルオブジェクトを受け付ける)
+    同じ内容の再アップロードでは解析をやり直さない
+    """
+    if cache is None:
+        cache = _PARSE_CACHE
+    with span('parse_cached') as s:
+        text = _normalize_content(content, encoding)
+        key = content_cache_key(text)
+        data = cache.get(key)
+        s.set(cache_hit=data is not None)
+        if data is None:
+            data = extract_data_from_markdown(text)
+            cache.put(key, data)
+        return data
 
 def get_zeb_comparison(data):
     """
-    ZEB化相当との比較データを生成
-    """
-    comparison = []
-    
-    # 外皮性能
-    u_wall = data['envelope_details'].get('PAL12', None)
-    comparison.append({
-        'category': '外壁U値',
-        'current': f"{u_wall:.2f}" if isinstance(u_wall, (int, float)) else str(u_wall),
-        'zeb_target': "0.60以下",
-        'status': '良好' if (isinstance(u_wall, (int, float)) and u_wall <= 0.6) else '要改善',
-        'action': '断熱材の厚肉化'
-    })
-    
-    u_window = data['envelope_details'].get('PAL20', None)
-    comparison.append({
-        'category': '窓U値',
-        'current': f"{u_window:.2f}" if isinstance(u_window, (int, float)) else str(u_window),
-        'zeb_target': "2.33以下",
-        'status': '良好' if (isinstance(u_window, (int, float)) and u_window <= 2.33) else '要改善',
-        'action': 'Low-E複層ガラス採用'
-    })
+    ZEB化相当との比較データを生成 (data は抽出結果の辞書または BuildingReport)
+    ルールは zeb_rules.ZEB_RULES に定義し、複数棟の一括判定 (evaluate_zeb_rules) と共通
+    """
+    from zeb_rules import zeb_comparison
+    return zeb_comparison(data)
 
-    # 開口率の計算とZEB目標
-    total_wall_area_net = sum(data['envelope_details'].get(f'PAL{i}', 0) for i in range(6, 10)) # PAL6-9: 外壁面積 (窓を除く)
-    total_window_area = sum(data['envelope_details'].get(f'PAL{i}', 0) for i in range(15, 19)) # PAL15-18: 窓面積
-    
-    # 開口率 = 窓面積 / (外壁面積 + 窓面積)
-    opening_ratio = (total_window_area / (total_wall_area_net + total_window_area) * 100) if (total_wall_area_net + total_window_area) > 0 else 0
-    comparison.append({
-        'category': '開口率',
-        'current': f"{opening_ratio:.1f}%",
-        'zeb_target': "30%以下",
-        'status': '良好' if opening_ratio <= 30 else '要改善',
-        'action': '窓面積の削減、高断熱化'
-    })
+def get_bei_label(calculation_method):
+    """
+    BEIの表記 (モデル建物法は BEIm)
+    """
+    return 'BEIm' if calculation_method == 'model_building' else 'BEI'
 
-    # 空調
-    ac_type = data['equipment_details'].get('AC1', '不明')
-    comparison.append({
-        'category': '主たる熱源',
-        'current': ac_type,
-        'zeb_target': "高効率ヒートポンプ等",
-        'status': '良好' if "ヒートポンプ" in str(ac_type) or "エアコン" in str(ac_type) else '要検討',
-        'action': '電気式高効率ヒートポンプへの転換'
-    })
-    
-    ac_efficiency = data['equipment_details'].get('AC6', None)
-    comparison.append({
-        'category': '熱源効率 (AC6)',
-        'current': f"{ac_efficiency:.2f}" if isinstance(ac_efficiency, (int, float)) else str(ac_efficiency),
-        'zeb_target': "1.2以上",
-        'status': '良好' if (isinstance(ac_efficiency, (int, float)) and ac_efficiency >= 1.2) else '要改善',
-        'action': '高効率熱源機の導入'
-    })
-    
-    ac_total_heat_exchanger = data['equipment_details'].get('AC13', '無')
-    comparison.append({
-        'category': '全熱交換器',
-        'current': ac_total_heat_exchanger,
-        'zeb_target': "有",
-        'status': '良好' if str(ac_total_heat_exchanger) == '有' else '要検討',
-        'action': '全熱交換器の導入'
-    })
+def get_bpi_label(calculation_method):
+    """
+    BPIの表記 (モデル建物法は BPIm)
+    """
+    return 'BPIm' if calculation_method == 'model_building' else 'BPI'
 
-    # 換気 (V5-7)
-    v_control_machine_room = data['equipment_details'].get('V_機械室', {}).get('V7', '無')
-    comparison.append({
-        'category': '換気制御 (機械室)',
-        'current': v_control_machine_room,
-        'zeb_target': "有",
-        'status': '良好' if v_control_machine_room == '有' else '要検討',
-        'action': '送風量制御の導入'
-    })
-    # V5-7の他の制御も追加
-    v_control_toilet = data['equipment_details'].get('V_便所', {}).get('V7', '無')
-    comparison.append({
-        'category': '換気制御 (便所)',
-        'current': v_control_toilet,
-        'zeb_target': "有",
-        'status': '良好' if v_control_toilet == '有' else '要検討',
-        'action': '送風量制御の導入'
-    })
-    v_control_parking = data['equipment_details'].get('V_駐車場', {}).get('V7', '無')
-    comparison.append({
-        'category': '換気制御 (駐車場)',
-        'current': v_control_parking,
-        'zeb_target': "有",
-        'status': '良好' if v_control_parking == '有' else '要検討',
-        'action': '送風量制御の導入'
-    })
-    v_control_kitchen = data['equipment_details'].get('V_厨房', {}).get('V7', '無')
-    comparison.append({
-        'category': '換気制御 (厨房)',
-        'current': v_control_kitchen,
-        'zeb_target': "有",
-        'status': '良好' if v_control_kitchen == '有' else '要検討',
-        'action': '送風量制御の導入'
-    })
+# 設備別BEIの項目と、最も大きい場合の改善策
+_SYSTEM_IMPROVEMENTS = [
+    ('bei_ac', '空調', '空調熱源の高効率化'),
+    ('bei_v', '換気', '換気設備の高効率化'),
+    ('bei_l', '照明', '照明設備の高効率化'),
+    ('bei_hw', '給湯', '給湯設備の高効率化'),
+    ('bei_ev', '昇降機', '昇降機の高効率化'),
+]
 
-    # 照明 (L4-7)
-    l_occupancy_sensor = data['equipment_details'].get('L', {}).get('L4', '無')
-    l_brightness_sensor = data['equipment_details'].get('L', {}).get('L5', '無')
-    comparison.append({
-        'category': '照明制御 (在室検知)',
-        'current': l_occupancy_sensor,
-        'zeb_target': "有",
-        'status': '良好' if l_occupancy_sensor == '有' else '要検討',
-        'action': '人感センサーの導入'
-    })
-    comparison.append({
-        'category': '照明制御 (明るさ)',
-        'current': l_brightness_sensor,
-        'zeb_target': "有",
-        'status': '良好' if l_brightness_sensor == '有' else '要検討',
-        'action': '昼光利用制御の導入'
-    })
-    # L6, L7も追加
-    l_time_control = data['equipment_details'].get('L', {}).get('L6', '無')
-    comparison.append({
-        'category': '照明制御 (時間)',
-        'current': l_time_control,
-        'zeb_target': "有",
-        'status': '良好' if l_time_control == '有' else '要検討',
-        'action': '時間制御の導入'
-    })
-    l_partial_lighting = data['equipment_details'].get('L', {}).get('L7', '無')
-    comparison.append({
-        'category': '照明制御 (部分照明)',
-        'current': l_partial_lighting,
-        'zeb_target': "有",
-        'status': '良好' if l_partial_lighting == '有' else '要検討',
-        'action': '部分照明の導入'
-    })
+_NUMBER_IN_TEXT_RE = re.compile(r'\d+(?:\.\d+)?')
 
-    # 給湯 (HW4-5)
-    hw_washroom_saving = data['equipment_details'].get('HW_洗面手洗い', {}).get('HW5', '無')
-    comparison.append({
-        'category': '給湯設備 (洗面節湯)',
-        'current': hw_washroom_saving,
-        'zeb_target': "有",
-        'status': '良好' if hw_washroom_saving == '有' else '要検討',
-        'action': '節湯器具の導入'
-    })
-    hw_bathroom_saving = data['equipment_details'].get('HW_浴室', {}).get('HW5', '無')
-    comparison.append({
-        'category': '給湯設備 (浴室節湯)',
-        'current': hw_bathroom_saving,
-        'zeb_target': "有",
-        'status': '良好' if hw_bathroom_saving == '有' else '要検討',
-        'action': '節湯器具の導入'
-    })
-    hw_kitchen_saving = data['equipment_details'].get('HW_厨房', {}).get('HW5', '無')
-    comparison.append({
-        'category': '給湯設備 (厨房節湯)',
-        'current': hw_kitchen_saving,
-        'zeb_target': "有",
-        'status': '良好' if hw_kitchen_saving == '有' else '要検討',
-        'action': '節湯器具の導入'
-    })
+def _has_solar_pv(value):
+    # "あり"/"有" または正の発電量 (表の残りの "| 0.00 |" などは無しとみなす)
+    text = str(value)
+    return 'あり' in text or '有' in text or any(float(number) > 0 for number in _NUMBER_IN_TEXT_RE.findall(text))
+
+def generate_improvement_roadmap(data):
+    """
+    ZEB化への改善ロードマップ (外皮 → 設備 → 制御 → 創エネの4段階)
+    各段階は {'step', 'title', 'desc'} の辞書
+    """
+    report = as_report(data)
+    if isinstance(report.bpi, (int, float)) and report.bpi <= 1.0:
+        envelope = ('外皮性能の維持', '現状の良好な性能を維持')
+    else:
+        envelope = ('外皮性能の強化', '断熱・日射遮蔽による熱負荷の低減')
+
+    # 設備別BEIが最も大きい設備から改善する
+    systems = [(getattr(report, field), name, title) for field, name, title in _SYSTEM_IMPROVEMENTS
+               if isinstance(getattr(report, field), (int, float))]
+    if systems:
+        value, name, title = max(systems, key=lambda system: system[0])
+        equipment = (title, f'設備別BEIが最大の{name} ({value:.2f}) を改善')
+    else:
+        equipment = ('空調熱源の高効率化', '最大消費源の本質的改善')
+
+    if _has_solar_pv(report.solar_pv):
+        generation = ('創エネルギーの拡充', '太陽光発電の増設・蓄電池の併用')
+    else:
+        generation = ('創エネルギーの導入', '太陽光発電等の再エネ設備')
+
+    steps = [envelope, equipment, ('制御の徹底強化', 'センサー連動制御の全域導入'), generation]
+    return [{'step': f'STEP {i}', 'title': title, 'desc': desc} for i, (title, desc) in enumerate(steps, 1)]
+
+# レーダーチャートの値を丸める桁数 (計算結果は小数第2位まで)
+RADAR_CHART_PRECISION = 2
+RADAR_CHART_DPI = 100
+
+
+class _BytesLRU:
+    """
+    合計バイト数の上限を持つLRU (描画済み画像の保持用)
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= len(self._entries.pop(key))
+            # 上限より大きいものは保持しない
+            if len(value) > self.max_bytes:
+                return
+            self._entries[key] = value
+            self.total_bytes += len(value)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+_RADAR_CHART_CACHE = _BytesLRU(16 * 1024 * 1024)
+
+def configure_radar_chart_cache(max_bytes=16 * 1024 * 1024):
+    """
+    レーダーチャートのPNGキャッシュを作り直す (max_bytes は保持するPNGの合計サイズ)
+    """
+    global _RADAR_CHART_CACHE
+    _RADAR_CHART_CACHE = _BytesLRU(max_bytes)
+    return _RADAR_CHART_CACHE
+
+def get_radar_chart_cache():
+    return _RADAR_CHART_CACHE
+
+def get_radar_values(data):
+    """
+    レーダーチャートに描く設備別BEIm (空調・換気・照明・給湯・昇降機の順、丸め済み)
+    """
+    report = as_report(data)
+    values = [report.bei_ac, report.bei_v, report.bei_l, report.bei_hw, report.bei_ev]
+    return tuple(round(v, RADAR_CHART_PRECISION) if isinstance(v, (int, float)) else v
+                 for v in values)
+
+def _radar_style():
+    # 配色や解像度を変えた場合に古い画像を使わないよう、キャッシュの鍵に含める
+    from fonts import find_cjk_font_file
+    return (COLOR_MAIN, COLOR_GRAY, find_cjk_font_file(), RADAR_CHART_DPI)
+
+class _RadarChartRenderer:
+    """
+    レーダーチャートの図を1度だけ組み立て、描画のたびに設計値の線と塗りだけを差し替える
+    (pyplot を使わないため、スレッドごとに別のインスタンスを使えば並行して描画できる)
+    """
+
+    categories = ["空調", "換気", "照明", "給湯", "昇降機"]
+
+    def __init__(self):
+        from fonts import get_font_properties
+        Figure, FigureCanvasAgg = _figure_classes()
+        font = get_font_properties()
+        self.style = _radar_style()
+        N = len(self.categories)
+        angles = [n / float(N) * 2 * math.pi for n in range(N)]
+        self.angles = angles + angles[:1]
+        base_values = [1.0] * (N + 1)
+
+        self.figure = Figure(figsize=(6, 6))
+        FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot(polar=True)
+
+        ax.plot(self.angles, base_values, color=COLOR_GRAY, linewidth=1, linestyle='dashed', label='基準値(1.0)')
+        ax.fill(self.angles, base_values, color=COLOR_GRAY, alpha=0.1)
+
+        self.line, = ax.plot(self.angles, base_values, color=COLOR_MAIN, linewidth=2, label='設計値')
+        self.patch, = ax.fill(self.angles, base_values, color=COLOR_MAIN, alpha=0.25)
+
+        ax.set_xticks(self.angles[:-1])
+        ax.set_xticklabels(self.categories, fontproperties=font)
+        ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1), prop=font)
+        ax.set_title('設備別BEIm分析', fontproperties=get_font_properties(14), pad=20)
+        self.ax = ax
 
-    return comparison
+    def render(self, values):
+        values = list(values)
+        values += values[:1]
+        self.line.set_data(self.angles, values)
+        self.patch.set_xy(list(zip(self.angles, values)))
+        self.ax.set_ylim(0, max(max(values), 1.5))
+
+        buf = io.BytesIO()
+        self.figure.savefig(buf, format='png', bbox_inches='tight', dpi=RADAR_CHART_DPI)
+        return buf.getvalue()
+
+
+_RADAR_RENDERERS = threading.local()
+
+def _render_radar_png(values):
+    # 図の構築はスレッドごとに1回 (配色などが変わった場合は作り直す)
+    renderer = getattr(_RADAR_RENDERERS, 'renderer', None)
+    if renderer is None or renderer.style != _radar_style():
+        renderer = _RADAR_RENDERERS.renderer = _RadarChartRenderer()
+    return renderer.render(values)
 
 def create_radar_chart(data):
     """
     設備別BEImのレーダーチャートを作成
+    同じ値 (丸め後) と配色の組み合わせは描画済みのPNGを再利用する
     """
-    categories = ["空調", "換気", "照明", "給湯", "昇降機"]
-    values = [
-        data.get('bei_ac', 1.0),
-        data.get('bei_v', 1.0),
-        data.get('bei_l', 1.0),
-        data.get('bei_hw', 1.0),
-        data.get('bei_ev', 0.0)
-    ]
-    
-    base_values = [1.0] * 5
-    
-    N = len(categories)
-    angles = [n / float(N) * 2 * np.pi for n in range(N)]
-    values += values[:1]
-    base_values += base_values[:1]
-    angles += angles[:1]
-    
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-    
-    ax.plot(angles, base_values, color=COLOR_GRAY, linewidth=1, linestyle='dashed', label='基準値(1.0)')
-    ax.fill(angles, base_values, color=COLOR_GRAY, alpha=0.1)
-    
-    ax.plot(angles, values, color=COLOR_MAIN, linewidth=2, label='設計値')
-    ax.fill(angles, values, color=COLOR_MAIN, alpha=0.25)
-    
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(categories, fontproperties='Noto Sans CJK JP')
-    ax.set_ylim(0, max(max(values), 1.5))
-    ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1), prop={'family': 'Noto Sans CJK JP'})
-    plt.title('設備別BEIm分析', fontproperties='Noto Sans CJK JP', fontsize=14, pad=20)
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-    buf.seek(0)
-    plt.close()
-    return buf
+    with span('radar_chart') as s:
+        values = get_radar_values(data)
+        key = (values, _radar_style())
+        png = _RADAR_CHART_CACHE.get(key)
+        s.set(cache_hit=png is not None)
+        if png is None:
+            png = _render_radar_png(values)
+            _RADAR_CHART_CACHE.put(key, png)
+        s.add_bytes(png)
+        return io.BytesIO(png)
 
 def extract_standard_sample_data(content):
     """
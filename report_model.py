@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽出データのモデル
+extract_data_from_markdown の辞書と相互に変換でき、既定値はここで一元管理する
+"""
+
+from dataclasses import dataclass, field, fields
+
+
+class _CodeFields:
+    """
+    "PAL6" → pal6 のように、コードを小文字にした名前のフィールドを持つクラスの共通処理
+    モデルに無いコード (追加した抽出ルールなど) は extra に保持する
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_codes(cls, values):
+        names = {f.name for f in fields(cls)} - {'extra'}
+        kwargs = {}
+        extra = {}
+        for code, value in values.items():
+            if code.lower() in names:
+                kwargs[code.lower()] = value
+            else:
+                extra[code] = value
+        return cls(**kwargs, extra=extra or None)
+
+    def to_codes(self):
+        codes = {f.name.upper(): getattr(self, f.name) for f in fields(self) if f.name != 'extra'}
+        if self.extra:
+            codes.update(self.extra)
+        return codes
+
+
+@dataclass(slots=True)
+class EnvelopeDetails(_CodeFields):
+    """
+    外皮 (PAL6-23)。面積は未入力なら0、性能値は不明なら None
+    """
+    pal6: float = 0.0
+    pal7: float = 0.0
+    pal8: float = 0.0
+    pal9: float = 0.0
+    pal10: float = 0.0
+    pal11: float = 0.0
+    pal12: float = None
+    pal13: float = None
+    pal14: float = None
+    pal15: float = 0.0
+    pal16: float = 0.0
+    pal17: float = 0.0
+    pal18: float = 0.0
+    pal19: float = 0.0
+    pal20: float = None
+    pal21: float = None
+    pal22: float = None
+    pal23: float = None
+    extra: dict = None
+
+    def wall_areas(self):
+        """
+        外壁面積 (北・東・南・西)
+        """
+        return [self.pal6, self.pal7, self.pal8, self.pal9]
+
+    def window_areas(self):
+        """
+        窓面積 (北・東・南・西)
+        """
+        return [self.pal15, self.pal16, self.pal17, self.pal18]
+
+
+@dataclass(slots=True)
+class VentilationControl(_CodeFields):
+    """
+    換気 (V5: 高効率電動機, V6: インバータ, V7: 送風量制御)
+    """
+    v5: str = '無'
+    v6: str = '無'
+    v7: str = '無'
+    extra: dict = None
+
+
+@dataclass(slots=True)
+class LightingControl(_CodeFields):
+    """
+    照明 (L4: 在室検知, L5: 明るさ検知, L6: タイムスケジュール, L7: 初期照度補正)
+    """
+    l4: str = '無'
+    l5: str = '無'
+    l6: str = '無'
+    l7: str = '無'
+    extra: dict = None
+
+
+@dataclass(slots=True)
+class HotWaterControl(_CodeFields):
+    """
+    給湯 (HW4: 配管保温仕様, HW5: 節湯器具)
+    """
+    hw4: str = None
+    hw5: str = '無'
+    extra: dict = None
+
+
+@dataclass(slots=True)
+class EquipmentDetails(_CodeFields):
+    """
+    設備 (空調の各項目と、室ごとの換気・照明・給湯)
+    換気と給湯は室名 → 値。見つからなかった室は含めない
+    """
+    ac1: str = '不明'
+    ac4: float = None
+    ac6: float = None
+    ac7: str = '不明'
+    ac10: float = None
+    ac12: float = None
+    ac13: str = '無'
+    lighting: LightingControl = None
+    ventilation: dict = field(default_factory=dict)
+    hot_water: dict = field(default_factory=dict)
+    extra: dict = None
+
+    @classmethod
+    def from_codes(cls, values):
+        values = dict(values)
+        lighting = values.pop('L', None)
+        ventilation = {}
+        hot_water = {}
+        for key in list(values):
+            if key.startswith('V_'):
+                ventilation[key[2:]] = VentilationControl.from_codes(values.pop(key))
+            elif key.startswith('HW_'):
+                hot_water[key[3:]] = HotWaterControl.from_codes(values.pop(key))
+        details = super(EquipmentDetails, cls).from_codes(values)
+        details.lighting = LightingControl.from_codes(lighting) if lighting is not None else None
+        details.ventilation = ventilation
+        details.hot_water = hot_water
+        return details
+
+    def to_codes(self):
+        codes = {f'AC{n}': getattr(self, f'ac{n}') for n in (1, 4, 6, 7, 10, 12, 13)}
+        codes.update((f'V_{room}', control.to_codes()) for room, control in self.ventilation.items())
+        if self.lighting is not None:
+            codes['L'] = self.lighting.to_codes()
+        codes.update((f'HW_{room}', control.to_codes()) for room, control in self.hot_water.items())
+        if self.extra:
+            codes.update(self.extra)
+        return codes
+
+    def ventilation_control(self, room):
+        return self.ventilation.get(room) or VentilationControl()
+
+    def lighting_control(self):
+        return self.lighting or LightingControl()
+
+    def hot_water_control(self, room):
+        return self.hot_water.get(room) or HotWaterControl()
+
+
+_BUILDING_FIELDS = ['building_name', 'total_area', 'location', 'region', 'solar_region', 'building_model',
+                    'calculation_method', 'bei_total', 'bpi', 'bei_ac', 'bei_v', 'bei_l', 'bei_hw', 'bei_ev',
+                    'solar_pv', 'cgs', 'judgment']
+
+
+@dataclass(slots=True)
+class BuildingReport:
+    """
+    1棟分の抽出データ
+    """
+    building_name: str = '不明'
+    total_area: float = 0.0
+    location: str = '不明'
+    region: str = '不明'
+    solar_region: str = '不明'
+    building_model: str = '不明'
+    calculation_method: str = 'standard_input'
+    bei_total: float = 1.0
+    bpi: float = 1.0
+    bei_target: float = None
+    bei_ac: float = 1.0
+    bei_v: float = 1.0
+    bei_l: float = 1.0
+    bei_hw: float = 1.0
+    bei_ev: float = 1.0
+    solar_pv: str = 'なし'
+    cgs: str = 'なし'
+    judgment: dict = field(default_factory=dict)
+    envelope: EnvelopeDetails = field(default_factory=EnvelopeDetails)
+    equipment: EquipmentDetails = field(default_factory=EquipmentDetails)
+    energy_consumption: dict = None
+    extra: dict = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        extract_data_from_markdown の辞書から作る
+        """
+        data = dict(data)
+        kwargs = {name: data.pop(name) for name in _BUILDING_FIELDS + ['bei_target'] if name in data}
+        return cls(**kwargs,
+                   envelope=EnvelopeDetails.from_codes(data.pop('envelope_details', {})),
+                   equipment=EquipmentDetails.from_codes(data.pop('equipment_details', {})),
+                   energy_consumption=data.pop('energy_consumption', None) or None,
+                   extra=data or None)
+
+    def to_dict(self):
+        """
+        extract_data_from_markdown と同じ形の辞書 (既定値を補った状態)
+        """
+        data = {name: getattr(self, name) for name in _BUILDING_FIELDS}
+        data['envelope_details'] = self.envelope.to_codes()
+        data['equipment_details'] = self.equipment.to_codes()
+        data['energy_consumption'] = dict(self.energy_consumption or {})
+        if self.bei_target is not None:
+            data['bei_target'] = self.bei_target
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+def format_value(value, fmt=None):
+    """
+    表示用の文字列 (数値は fmt で書式化し、不明 (None) は "-")
+    """
+    if value is None:
+        return '-'
+    if isinstance(value, (int, float)) and fmt:
+        return f"{value:{fmt}}"
+    return str(value)
+
+
+def as_report(data):
+    """
+    辞書または BuildingReport を BuildingReport にそろえる
+    """
+    return data if isinstance(data, BuildingReport) else BuildingReport.from_dict(data)
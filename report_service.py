@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+レポート生成サービス
+python -m report_service [--host 127.0.0.1] [--port 8765] [--workers N] [--queue-size N]
+
+  POST /jobs                  本文に計算結果 (Markdown) を送ると {"job_id": ...} を返す (キューが満杯なら503)
+  GET  /jobs/<id>[?wait=秒]   状態 (queued/running/done/error) と抽出データ。wait を付けると完了まで待つ
+  GET  /jobs/<id>/html        生成したHTMLレポート
+
+解析とHTML生成はプロセスプールで実行し、受付は上限付きのキューで制限する
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+# 完了したジョブを保持する時間 (秒)
+JOB_TTL = 600
+
+_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            409: 'Conflict', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+def _generate_report(content):
+    """
+    ワーカープロセスで実行する抽出とHTML生成
+    """
+    from report_generator import extract_data_cached
+    from html_slides_generator import generate_html_slides
+    data = extract_data_cached(content)
+    return data, generate_html_slides(data)
+
+
+class Job:
+    def __init__(self, content):
+        self.id = uuid.uuid4().hex
+        self.content = content
+        self.status = 'queued'
+        self.data = None
+        self.html = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'data': self.data,
+            'error': self.error,
+            'elapsed': (self.finished or time.time()) - self.submitted,
+        }
+
+
+class ReportService:
+    """
+    上限付きキューとワーカーでジョブを処理する
+    """
+
+    def __init__(self, workers=None, queue_size=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.jobs = {}
+        self.executor = None
+        self._tasks = []
+
+    async def start(self):
+        from batch_report import _init_worker
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown(cancel_futures=True)
+
+    def submit(self, content):
+        """
+        ジョブを登録する (キューが満杯なら asyncio.QueueFull)
+        """
+        self._expire()
+        job = Job(content)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        return job
+
+    def _expire(self):
+        limit = time.time() - JOB_TTL
+        for job_id in [job.id for job in self.jobs.values() if job.finished and job.finished < limit]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = 'running'
+            try:
+                job.data, job.html = await loop.run_in_executor(self.executor, _generate_report, job.content)
+                job.status = 'done'
+            except Exception as e:
+                job.status = 'error'
+                job.error = f"{type(e).__name__}: {e}"
+            finally:
+                job.content = None
+                job.finished = time.time()
+                job.done.set()
+                self.queue.task_done()
+
+    async def handle(self, reader, writer):
+        try:
+            status, body, content_type, headers = await self._dispatch(reader)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            status, body, content_type, headers = 400, {'error': 'bad request'}, None, {}
+        if content_type is None:
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}",
+                "Connection: close"]
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) < 2:
+            raise ValueError('request line')
+        method, target = request_line[0], request_line[1]
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['jobs']:
+            if method != 'POST':
+                return 405, {'error': 'method not allowed'}, None, {}
+            if length > MAX_UPLOAD_BYTES:
+                return 413, {'error': 'upload too large'}, None, {}
+            content = await reader.readexactly(length)
+            try:
+                job = self.submit(content)
+            except asyncio.QueueFull:
+                return 503, {'error': 'queue full'}, None, {'Retry-After': '1'}
+            return 202, {'job_id': job.id, 'status': job.status}, None, {}
+
+        if len(parts) in (2, 3) and parts[0] == 'jobs' and method == 'GET':
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return 404, {'error': 'unknown job'}, None, {}
+            if len(parts) == 3:
+                if parts[2] != 'html':
+                    return 404, {'error': 'not found'}, None, {}
+                if job.status != 'done':
+                    return 409, job.to_dict(), None, {}
+                return 200, job.html.encode('utf-8'), 'text/html; charset=utf-8', {}
+            wait = float(parse_qs(url.query).get('wait', ['0'])[0])
+            if wait > 0 and not job.done.is_set():
+                try:
+                    await asyncio.wait_for(job.done.wait(), timeout=min(wait, 60))
+                except asyncio.TimeoutError:
+                    pass
+            return 200, job.to_dict(), None, {}
+
+        return 404, {'error': 'not found'}, None, {}
+
+
+async def serve(host='127.0.0.1', port=8765, workers=None, queue_size=64):
+    service = ReportService(workers, queue_size)
+    await service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"report_service: http://{host}:{port} (workers={service.workers}, queue={queue_size})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+class ReportServiceClient:
+    """
+    app.py などからジョブを投入して結果を受け取る
+    """
+
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def submit(self, content):
+        import requests
+        # キューが満杯の間は Retry-After に従って待つ
+        deadline = time.time() + self.timeout
+        while True:
+            response = requests.post(self.base_url + '/jobs', data=content, timeout=self.timeout)
+            if response.status_code != 503 or time.time() > deadline:
+                response.raise_for_status()
+                return response.json()['job_id']
+            time.sleep(float(response.headers.get('Retry-After', 1)))
+
+    def wait(self, job_id):
+        """
+        完了まで待って (抽出データ, HTML) を返す
+        """
+        import requests
+        deadline = time.time() + self.timeout
+        while True:
+            response = requests.get(f"{self.base_url}/jobs/{job_id}", params={'wait': 30}, timeout=self.timeout)
+            response.raise_for_status()
+            job = response.json()
+            if job['status'] == 'error':
+                raise RuntimeError(job['error'])
+            if job['status'] == 'done':
+                break
+            if time.time() > deadline:
+                raise TimeoutError(f"job {job_id} did not finish in {self.timeout}s")
+        response = requests.get(f"{self.base_url}/jobs/{job_id}/html", timeout=self.timeout)
+        response.raise_for_status()
+        return job['data'], response.text
+
+    def generate(self, content):
+        return self.wait(self.submit(content))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="レポート生成サービス")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="ワーカープロセス数 (既定はCPU数)")
+    parser.add_argument("--queue-size", type=int, default=64, help="待機できるジョブ数の上限")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,25 +4,39 @@
 スライド作成モジュール (Streamlit対応版 v1.3)
 モデル建物法と標準入力法の自動切り替え対応
 標準入力法の「ちら見せ」と組織自立診断への誘導を実装
+
+既定ではスライドの構成ごとに差し込み位置付きのマスター (PPTX) を1度だけ作成してメモリに保持し、
+レポートごとには文字列・色・画像を差し込んで書き出すだけにする (use_template=False で従来どおり毎回組み立てる)
 """
 
 from pptx import Presentation
-from pptx.util import Inches, Pt
+from pptx.util import Inches, Pt, Emu
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR, MSO_AUTO_SIZE
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
 from datetime import datetime
+import hashlib
 import io
-import tempfile
-import os
+import struct
+import threading
+import zipfile
+import zlib
+
+from asset_registry import get_image_bytes
+from html_template import CompiledTemplate
+from tracing import span
 
-# report_generator.pyからカラー定義をインポート
+# report_generator.pyからカラー定義 (16進の文字列) をインポート
+import report_generator
 from report_generator import (
-    COLOR_MAIN, COLOR_RED, COLOR_GREEN,
     get_bei_label, get_bpi_label,
-    generate_improvement_roadmap
+    generate_improvement_roadmap, create_radar_chart
 )
 
+COLOR_MAIN = RGBColor.from_string(report_generator.COLOR_MAIN.lstrip('#'))
+COLOR_RED = RGBColor.from_string(report_generator.COLOR_RED.lstrip('#'))
+COLOR_GREEN = RGBColor.from_string(report_generator.COLOR_GREEN.lstrip('#'))
+
 # 新しいカラー定義 (HTMLスライドと同期)
 COLOR_ACCENT = RGBColor(244, 162, 97) # #F4A261
 COLOR_LIGHT_BLUE = RGBColor(231, 243, 255) # #e7f3ff
@@ -33,75 +47,341 @@ COLOR_GRAY = RGBColor(153, 153, 153) # #999999
 COLOR_WHITE = RGBColor(255, 255, 255)
 COLOR_BLACK = RGBColor(0, 0, 0)
 
-def create_presentation(data, chart_stacked_bytes, chart_pie_bytes, chart_bei_bytes):
+# グラフ画像の幅
+CHART_WIDTH = Inches(9.4)
+
+
+def create_presentation(data, chart_stacked_bytes, chart_pie_bytes, chart_bei_bytes, use_template=True):
     """
     PowerPointプレゼンテーションを作成してBytesIOで返す
+    use_template=True ではマスターに値を差し込む (差し込めない値の場合は従来どおり組み立てる)
     """
+    deck = _deck_fields(data)
+    images = {'stacked': chart_stacked_bytes, 'pie': chart_pie_bytes, 'bei': chart_bei_bytes}
+    if use_template and _fits_template(deck, images):
+        return get_deck_template(deck).render(deck, images)
+
     prs = Presentation()
-    
-    # 16:9ワイドスクリーン
-    prs.slide_width = Inches(10)
-    prs.slide_height = Inches(5.625)
-    
-    add_title_slide_tech_report_style(prs, data)
-    add_summary_slide(prs, data)
-    
-    calc_method = data.get("calculation_method", "standard_input")
-    is_model = (calc_method == "model_building")
-    
-    # 標準入力法の場合のみ、詳細グラフを追加
-    if not is_model:
-        # 一時ファイルにグラフを保存してスライドに追加
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_stacked:
-            tmp_stacked.write(chart_stacked_bytes.read())
-            tmp_stacked_path = tmp_stacked.name
-        chart_stacked_bytes.seek(0)
-        
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_pie:
-            tmp_pie.write(chart_pie_bytes.read())
-            tmp_pie_path = tmp_pie.name
-        chart_pie_bytes.seek(0)
-        
-        slide3 = prs.slides.add_slide(prs.slide_layouts[6])
-        add_slide_title(slide3, "エネルギー消費性能の詳細分析")
-        slide3.shapes.add_picture(tmp_stacked_path, Inches(0.3), Inches(0.95), width=Inches(9.4))
-        
-        slide4 = prs.slides.add_slide(prs.slide_layouts[6])
-        add_slide_title(slide4, "設備別一次エネルギー消費量の比較")
-        slide4.shapes.add_picture(tmp_pie_path, Inches(0.3), Inches(1.1), width=Inches(9.4))
-        
-        os.unlink(tmp_stacked_path)
-        os.unlink(tmp_pie_path)
-    
-    add_envelope_worst_analysis_slide(prs, data)
-    
-    # BEI比較グラフを一時ファイルに保存
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_bei:
-        tmp_bei.write(chart_bei_bytes.read())
-        tmp_bei_path = tmp_bei.name
-    chart_bei_bytes.seek(0)
-    
-    slide6 = prs.slides.add_slide(prs.slide_layouts[6])
-    bei_label = get_bei_label(calc_method)
-    add_slide_title(slide6, f"用途別エネルギー消費傾向: {bei_label}分析")
-    slide6.shapes.add_picture(tmp_bei_path, Inches(0.3), Inches(1.05), width=Inches(9.4))
-    
-    os.unlink(tmp_bei_path)
-    
-    # モデル建物法の場合に標準入力法への誘導スライドを追加
-    if is_model:
-        add_standard_input_teaser_slide(prs, data)
+    _build_deck(prs, deck, images)
 
-    add_improvement_roadmap_slide(prs, data)
-    add_organizational_diagnosis_slide(prs, data)
-    
     # BytesIOに保存
     pptx_bytes = io.BytesIO()
     prs.save(pptx_bytes)
     pptx_bytes.seek(0)
-    
+
+    return pptx_bytes
+
+def generate_pptx_report(data, use_template=True):
+    """
+    抽出データからPowerPointレポートを作成してBytesIOで返す
+    グラフは HTML レポートと同じ画像 (energy_comparison.png / energy_breakdown.png) とレーダーチャートを使う
+    """
+    with span('pptx_assets'):
+        chart_stacked, chart_pie = get_chart_images()
+    chart_bei = create_radar_chart(data)
+    with span('pptx_render') as s:
+        pptx_bytes = create_presentation(data, chart_stacked, chart_pie, chart_bei, use_template=use_template)
+        s.add_bytes(pptx_bytes.getbuffer().nbytes)
     return pptx_bytes
 
+def get_chart_images():
+    """
+    (エネルギー消費量の比較, 内訳) のグラフ画像 (PowerPointに埋め込める形式のバイト列)
+    """
+    return _chart_image('energy_comparison.png'), _chart_image('energy_breakdown.png')
+
+def preload_pptx_resources():
+    """
+    グラフ画像の変換と描画ライブラリの読み込みを先に済ませておく (ワーカーの起動時など)
+    """
+    from report_generator import _figure_classes
+    _figure_classes()
+    get_chart_images()
+
+# ファイル名 → (元の内容, PowerPointに埋め込める内容)
+_chart_images = {}
+_chart_images_lock = threading.Lock()
+
+def _chart_image(filename):
+    """
+    グラフ画像の内容 (PowerPointが扱えない形式 (WebPなど) はPNGに変換し、元の内容が変わるまで使い回す)
+    """
+    content = get_image_bytes(filename)
+    if content is None:
+        raise FileNotFoundError(f"画像が見つかりません: {filename}")
+    cached = _chart_images.get(filename)
+    if cached is not None and cached[0] is content:
+        return cached[1]
+    converted = content
+    if not content.startswith((b'\x89PNG', b'\xff\xd8', b'GIF8', b'BM')):
+        from PIL import Image
+        stream = io.BytesIO()
+        Image.open(io.BytesIO(content)).save(stream, 'PNG')
+        converted = stream.getvalue()
+    with _chart_images_lock:
+        _chart_images[filename] = (content, converted)
+    return converted
+
+def _deck_fields(data):
+    """
+    レポートごとに変わる値 (スライドに差し込む文字列と色)
+    """
+    calc_method = data.get("calculation_method", "standard_input")
+    return {
+        'is_model': calc_method == "model_building",
+        'title': _title_fields(data),
+        'summary': _summary_fields(data),
+        'envelope': _envelope_fields(data),
+        'bei_title': f"用途別エネルギー消費傾向: {get_bei_label(calc_method)}分析",
+        'roadmap': _roadmap_fields(data),
+    }
+
+def _build_deck(prs, deck, images):
+    """
+    スライドを順に組み立て、グラフ画像の枠 (名前 → Picture) を返す
+    """
+    # 16:9ワイドスクリーン
+    prs.slide_width = Inches(10)
+    prs.slide_height = Inches(5.625)
+    pictures = {}
+
+    _draw_title_slide(prs, deck['title'])
+    _draw_summary_slide(prs, deck['summary'])
+
+    # 標準入力法の場合のみ、詳細グラフを追加
+    if not deck['is_model']:
+        pictures['stacked'] = _draw_chart_slide(prs, "エネルギー消費性能の詳細分析", images['stacked'], Inches(0.95))
+        pictures['pie'] = _draw_chart_slide(prs, "設備別一次エネルギー消費量の比較", images['pie'], Inches(1.1))
+
+    _draw_envelope_slide(prs, deck['envelope'])
+    pictures['bei'] = _draw_chart_slide(prs, deck['bei_title'], images['bei'], Inches(1.05))
+
+    # モデル建物法の場合に標準入力法への誘導スライドを追加
+    if deck['is_model']:
+        add_standard_input_teaser_slide(prs, None)
+
+    _draw_roadmap_slide(prs, deck['roadmap'])
+    add_organizational_diagnosis_slide(prs, None)
+    return pictures
+
+
+class DeckTemplate:
+    """
+    差し込み位置付きのマスターを書き出したもの
+    ZIP内の各パートを、圧縮済みのエントリ (固定のパート) か、
+    差し込み位置で分割したXML (CompiledTemplate) で保持する
+    """
+
+    def __init__(self, parts, picture_width):
+        self.parts = parts
+        self.picture_width = picture_width
+
+    def render(self, deck, images):
+        """
+        値と画像を差し込んだPPTXをBytesIOで返す
+        """
+        context = dict(_flatten_fields(deck))
+        media = {}
+        for name, image in images.items():
+            if name not in self.picture_width:
+                continue
+            blob = _image_blob(image)
+            # 同じ内容の画像は1つのパートにまとめる
+            digest = hashlib.sha1(blob).hexdigest()
+            filename = media.setdefault(digest, (f"chart{len(media) + 1}.png", blob))[0]
+            context[f'image_{name}_media'] = filename
+            context[f'image_{name}_cy'] = _scaled_height(blob, self.picture_width[name])
+        entries = [_zip_entry(name, part.render(context).encode('utf-8')) if isinstance(part, CompiledTemplate) else part
+                   for name, part in self.parts]
+        # PNGは圧縮済みのため無圧縮で格納する
+        entries.extend(_zip_entry(f"ppt/media/{filename}", blob, compress=False) for filename, blob in media.values())
+        pptx_bytes = io.BytesIO()
+        _write_zip(pptx_bytes, entries)
+        pptx_bytes.seek(0)
+        return pptx_bytes
+
+
+# ZIPのエントリ (名前, CRC32, 元のサイズ, 格納するデータ, 圧縮方式)
+def _zip_entry(name, data, compress=True):
+    if compress:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        payload = compressor.compress(data) + compressor.flush()
+    else:
+        payload = data
+    return name.encode('utf-8'), zlib.crc32(data), len(data), payload, zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+
+def _write_zip(fp, entries):
+    """
+    エントリを書き出す (圧縮済みのデータをそのまま使えるよう zipfile を介さずに書く)
+    """
+    # 更新日時は 1980-01-01 00:00 (DOS形式の最小値)
+    dos_time, dos_date = 0, (0 << 9) | (1 << 5) | 1
+    central = []
+    offset = 0
+    for name, crc, size, payload, method in entries:
+        flags = 0 if name.isascii() else 0x800
+        header = struct.pack('<4s5H3L2H', b'PK\x03\x04', 20, flags, method, dos_time, dos_date,
+                             crc, len(payload), size, len(name), 0)
+        fp.write(header)
+        fp.write(name)
+        fp.write(payload)
+        central.append(struct.pack('<4s6H3L5H2L', b'PK\x01\x02', 20, 20, flags, method, dos_time, dos_date,
+                                   crc, len(payload), size, len(name), 0, 0, 0, 0, 0, offset) + name)
+        offset += len(header) + len(name) + len(payload)
+    directory = b''.join(central)
+    fp.write(directory)
+    fp.write(struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, len(entries), len(entries), len(directory), offset, 0))
+
+
+# マスターの作成時に色の差し込み位置として使う色 (スライドの固定部分では使わないこと)
+_SENTINEL_COLOR = (0x0F, 0x0E)
+# マスターの作成時に画像の高さの差し込み位置として使う値 (EMU)
+_SENTINEL_HEIGHT = 7770000
+
+_DECK_TEMPLATES = {}
+_DECK_TEMPLATES_LOCK = threading.Lock()
+
+def _layout_key(deck):
+    # 値以外でスライドの構成が変わる要素 (計算方法、ワースト室とロードマップの件数)
+    return deck['is_model'], len(deck['envelope']['worst_rooms']), len(deck['roadmap'])
+
+def get_deck_template(deck):
+    """
+    deck と同じ構成のマスター (構成ごとにプロセスで1回だけ作成する)
+    """
+    key = _layout_key(deck)
+    template = _DECK_TEMPLATES.get(key)
+    if template is None:
+        template = build_deck_template(deck)
+        with _DECK_TEMPLATES_LOCK:
+            template = _DECK_TEMPLATES.setdefault(key, template)
+    return template
+
+def clear_deck_templates():
+    """
+    作成済みのマスターを破棄する (スライドの組み立て方を変更した後に呼ぶ)
+    """
+    with _DECK_TEMPLATES_LOCK:
+        _DECK_TEMPLATES.clear()
+
+def build_deck_template(deck):
+    """
+    値の代わりに差し込み位置を入れてスライドを組み立て、DeckTemplate にする
+    """
+    colors = {}
+    tokens = _token_fields(deck, '', colors)
+    tokens['is_model'] = deck['is_model']
+    # 画像の枠は枠ごとに異なる仮の画像で作る (まとめられないように)
+    placeholders = {name: _placeholder_png(i) for i, name in enumerate(('stacked', 'pie', 'bei'))}
+    prs = Presentation()
+    pictures = _build_deck(prs, tokens, placeholders)
+
+    replacements = {}
+    picture_width = {}
+    for i, (name, picture) in enumerate(pictures.items()):
+        picture.height = Emu(_SENTINEL_HEIGHT + i)
+        picture_width[name] = picture.width
+        partname = picture.part.related_part(picture._element.blip_rId).partname
+        replacements[f'cy="{_SENTINEL_HEIGHT + i}"'] = f'cy="{{{{ image_{name}_cy }}}}"'
+        replacements[f'Target="../media/{partname.filename}"'] = f'Target="../media/{{{{ image_{name}_media }}}}"'
+    for token, sentinel in colors.items():
+        replacements[f'val="{sentinel}"'] = f'val="{{{{ {token} }}}}"'
+    placeholder_media = {str(picture.part.related_part(picture._element.blip_rId).partname)[1:]
+                         for picture in pictures.values()}
+
+    master = io.BytesIO()
+    prs.save(master)
+    parts = []
+    with zipfile.ZipFile(master) as package:
+        for name in package.namelist():
+            if name in placeholder_media:
+                continue
+            blob = package.read(name)
+            if name.startswith('ppt/slides/'):
+                text = blob.decode('utf-8')
+                for old, new in replacements.items():
+                    text = text.replace(old, new)
+                parts.append((name, CompiledTemplate(text)))
+            else:
+                parts.append((name, _zip_entry(name, blob)))
+    return DeckTemplate(parts, picture_width)
+
+def _token_fields(fields, prefix, colors):
+    """
+    値を差し込み位置 ("{{ summary_info }}" など) に置き換えた fields (色は仮の色にして colors に記録する)
+    """
+    if isinstance(fields, dict):
+        return {key: _token_fields(value, f"{prefix}{key}_", colors) for key, value in fields.items() if key != 'is_model'}
+    if isinstance(fields, list):
+        return [_token_fields(value, f"{prefix}{i}_", colors) for i, value in enumerate(fields)]
+    if isinstance(fields, RGBColor):
+        sentinel = RGBColor(*_SENTINEL_COLOR, len(colors) + 1)
+        colors[prefix[:-1]] = str(sentinel)
+        return sentinel
+    return "{{ " + prefix[:-1] + " }}"
+
+def _flatten_fields(fields, prefix=''):
+    """
+    差し込み位置の名前と値の組 (色は16進表記)
+    """
+    if isinstance(fields, dict):
+        for key, value in fields.items():
+            if key != 'is_model':
+                yield from _flatten_fields(value, f"{prefix}{key}_")
+    elif isinstance(fields, list):
+        for i, value in enumerate(fields):
+            yield from _flatten_fields(value, f"{prefix}{i}_")
+    else:
+        yield prefix[:-1], str(fields)
+
+def _fits_template(deck, images):
+    """
+    マスターに差し込める値か (改行や制御文字を含む文字列、PNG以外の画像は組み立てる)
+    """
+    for _, value in _flatten_fields(deck):
+        if any(ord(char) < 0x20 for char in value):
+            return False
+    return all(_image_blob(images[name]).startswith(b'\x89PNG') for name in ('stacked', 'pie', 'bei')
+               if not (deck['is_model'] and name != 'bei'))
+
+def _image_blob(image):
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image)
+    return image.getvalue() if hasattr(image, 'getvalue') else _read_stream(image)
+
+def _read_stream(stream):
+    stream.seek(0)
+    blob = stream.read()
+    stream.seek(0)
+    return blob
+
+def _scaled_height(blob, width):
+    # add_picture で幅を指定した場合と同じ高さ (縦横比を保つ)
+    from pptx.parts.image import Image
+    image = Image.from_blob(blob)
+    (width_px, height_px), (horz_dpi, vert_dpi) = image.size, image.dpi
+    native_cx = int(914400 * width_px / horz_dpi)
+    native_cy = int(914400 * height_px / vert_dpi)
+    return int(round(native_cy * float(width) / float(native_cx)))
+
+def _placeholder_png(index):
+    from PIL import Image
+    stream = io.BytesIO()
+    Image.new('RGB', (1, 1), (index, index, index)).save(stream, 'PNG')
+    return stream.getvalue()
+
+
+def add_picture(slide, image, left, top, width):
+    """
+    画像 (BytesIO またはバイト列) を一時ファイルを介さずにメモリ上から追加する
+    同じ内容の画像はパッケージ内で1つの画像パートにまとめられる (python-pptx がSHA1で照合)
+    """
+    stream = io.BytesIO(image) if isinstance(image, (bytes, bytearray, memoryview)) else image
+    picture = slide.shapes.add_picture(stream, left, top, width=width)
+    # 呼び出し側で同じストリームを再利用できるよう先頭に戻す
+    stream.seek(0)
+    return picture
+
 def add_slide_title(slide, title_text):
     title_box = slide.shapes.add_textbox(Inches(0.3), Inches(0.3), Inches(9.4), Inches(0.5))
     title_frame = title_box.text_frame
@@ -112,118 +392,139 @@ def add_slide_title(slide, title_text):
     title_para.font.color.rgb = COLOR_MAIN
     title_para.font.name = 'Noto Sans JP'
 
+def _draw_chart_slide(prs, title, image, top):
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    add_slide_title(slide, title)
+    return add_picture(slide, image, Inches(0.3), top, CHART_WIDTH)
+
+def _title_fields(data):
+    return {
+        'building_name': data['building_name'],
+        'date': datetime.now().strftime('%Y.%m.%d'),
+    }
+
 def add_title_slide_tech_report_style(prs, data):
+    _draw_title_slide(prs, _title_fields(data))
+
+def _draw_title_slide(prs, fields):
     slide = prs.slides.add_slide(prs.slide_layouts[6])
     center_box = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(2.5), Inches(0.8), Inches(5), Inches(4))
     center_box.fill.solid()
     center_box.fill.fore_color.rgb = COLOR_MAIN
     center_box.line.fill.background()
-    
+
     logo_box = slide.shapes.add_textbox(Inches(3.5), Inches(1.3), Inches(3), Inches(0.4))
     logo_box.text_frame.text = "one building"
     logo_box.text_frame.paragraphs[0].font.size = Pt(24)
     logo_box.text_frame.paragraphs[0].font.color.rgb = COLOR_WHITE
     logo_box.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
-    
+
     building_box = slide.shapes.add_textbox(Inches(3), Inches(2.0), Inches(4), Inches(0.4))
-    building_box.text_frame.text = data['building_name']
+    building_box.text_frame.text = fields['building_name']
     building_box.text_frame.paragraphs[0].font.size = Pt(22)
     building_box.text_frame.paragraphs[0].font.color.rgb = COLOR_WHITE
     building_box.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
-    
+
     title_box = slide.shapes.add_textbox(Inches(3), Inches(2.6), Inches(4), Inches(0.5))
     title_box.text_frame.text = "技術レポート"
     title_box.text_frame.paragraphs[0].font.size = Pt(28)
     title_box.text_frame.paragraphs[0].font.color.rgb = COLOR_WHITE
     title_box.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
-    
+
     date_box = slide.shapes.add_textbox(Inches(3.5), Inches(3.5), Inches(3), Inches(0.35))
-    date_box.text_frame.text = datetime.now().strftime('%Y.%m.%d')
+    date_box.text_frame.text = fields['date']
     date_box.text_frame.paragraphs[0].font.size = Pt(16)
     date_box.text_frame.paragraphs[0].font.color.rgb = COLOR_WHITE
     date_box.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
 
+def _summary_fields(data):
+    is_compliant = (data['bei_total'] <= 1.0)
+    return {
+        'info': f"建物名称: {data['building_name']}  |  所在地: {data['location']}  |  延べ面積: {data['total_area']} m²",
+        'status_text': f"診断結果: {('基準適合' if is_compliant else '基準非適合')}",
+        'status_color': COLOR_GREEN if is_compliant else COLOR_RED,
+        'status_bg_color': COLOR_LIGHT_GREEN if is_compliant else COLOR_LIGHT_RED,
+        'risk_title': f"▲{('優位性' if is_compliant else '重要')}: 経営影響の特定",
+        # 法的リスク
+        'legal_risk': "● 法的リスク: " + ("基準適合。建築確認申請がスムーズに進められます。" if is_compliant
+                                         else "基準非適合。改正省エネ法に基づき建築確認が受理されない恐れがあります。"),
+        # 事業リスク
+        'business_risk': "● 事業リスク: " + ("光熱費削減による運用コストの低減、企業イメージ向上。" if is_compliant
+                                           else "高い光熱費による運用コストの逼迫、競争力低下。"),
+        # 資産価値リスク
+        'asset_risk': "● 資産価値リスク: " + ("ZEB認定取得の可能性、ESG投資基準への適合、不動産価値向上。" if is_compliant
+                                           else "ZEB化遅延による不動産価値の低下、市場評価の悪化。"),
+    }
+
 def add_summary_slide(prs, data):
+    _draw_summary_slide(prs, _summary_fields(data))
+
+def _draw_summary_slide(prs, fields):
     slide = prs.slides.add_slide(prs.slide_layouts[6])
     add_slide_title(slide, "1. 総合評価サマリー: 現状と経営リスク")
-    
+
     info_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.0), Inches(9), Inches(0.5))
-    info_box.text_frame.text = f"建物名称: {data['building_name']}  |  所在地: {data['location']}  |  延べ面積: {data['total_area']} m²"
+    info_box.text_frame.text = fields['info']
     info_box.text_frame.paragraphs[0].font.size = Pt(11)
     info_box.text_frame.paragraphs[0].font.color.rgb = COLOR_GRAY
-    
-    is_compliant = (data['bei_total'] <= 1.0)
-    status_color = COLOR_GREEN if is_compliant else COLOR_RED
-    status_bg_color = COLOR_LIGHT_GREEN if is_compliant else COLOR_LIGHT_RED
-    status_text = f"診断結果: {('基準適合' if is_compliant else '基準非適合')}"
-    
+
+    status_color = fields['status_color']
+
     # 総合判定結果
     res_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.6), Inches(4.5), Inches(0.5))
-    res_box.text_frame.text = status_text
+    res_box.text_frame.text = fields['status_text']
     res_box.text_frame.paragraphs[0].font.size = Pt(18)
     res_box.text_frame.paragraphs[0].font.bold = True
     res_box.text_frame.paragraphs[0].font.color.rgb = status_color
-    
+
     # 経営リスク評価
     risk_shape = slide.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE, Inches(0.5), Inches(2.2), Inches(9), Inches(3.0))
     risk_shape.fill.solid()
-    risk_shape.fill.fore_color.rgb = status_bg_color
+    risk_shape.fill.fore_color.rgb = fields['status_bg_color']
     risk_shape.line.color.rgb = status_color
-    
+
     tf = risk_shape.text_frame
     tf.word_wrap = True
     tf.auto_size = MSO_AUTO_SIZE.SHAPE_TO_FIT_TEXT
 
     p1 = tf.paragraphs[0]
-    p1.text = f"▲{('優位性' if is_compliant else '重要')}: 経営影響の特定"
+    p1.text = fields['risk_title']
     p1.font.bold = True
     p1.font.color.rgb = status_color
     p1.font.size = Pt(14)
-    
-    # 法的リスク
-    p2 = tf.add_paragraph()
-    p2.text = "● 法的リスク: "
-    if is_compliant:
-        p2.text += "基準適合。建築確認申請がスムーズに進められます。"
-    else:
-        p2.text += "基準非適合。改正省エネ法に基づき建築確認が受理されない恐れがあります。"
-    p2.font.size = Pt(12)
-    p2.font.name = 'Noto Sans JP'
-
-    # 事業リスク
-    p3 = tf.add_paragraph()
-    p3.text = "● 事業リスク: "
-    if is_compliant:
-        p3.text += "光熱費削減による運用コストの低減、企業イメージ向上。"
-    else:
-        p3.text += "高い光熱費による運用コストの逼迫、競争力低下。"
-    p3.font.size = Pt(12)
-    p3.font.name = 'Noto Sans JP'
-
-    # 資産価値リスク
-    p4 = tf.add_paragraph()
-    p4.text = "● 資産価値リスク: "
-    if is_compliant:
-        p4.text += "ZEB認定取得の可能性、ESG投資基準への適合、不動産価値向上。"
-    else:
-        p4.text += "ZEB化遅延による不動産価値の低下、市場評価の悪化。"
-    p4.font.size = Pt(12)
-    p4.font.name = 'Noto Sans JP'
 
-def add_envelope_worst_analysis_slide(prs, data):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    for key in ('legal_risk', 'business_risk', 'asset_risk'):
+        p = tf.add_paragraph()
+        p.text = fields[key]
+        p.font.size = Pt(12)
+        p.font.name = 'Noto Sans JP'
+
+def _envelope_fields(data):
     calc_method = data.get('calculation_method', 'standard_input')
     bpi_label = get_bpi_label(calc_method)
-    add_slide_title(slide, f"2. 外皮性能評価 ({bpi_label}) と改善ポイント")
-    
     bpi_val = data.get('bpi', 1.0)
-    pal_design = data.get('pal_design', 1.0)
-    pal_standard = data.get('pal_standard', 1.0)
+    # 標準入力法の場合のみワースト室分析を追加 (最大3つまで表示)
+    worst_rooms = data.get('worst_rooms') if calc_method != 'model_building' else None
+    return {
+        'title': f"2. 外皮性能評価 ({bpi_label}) と改善ポイント",
+        'bpi_text': f"{bpi_label} 値: {bpi_val:.2f}",
+        'comment': f"外皮性能は{bpi_val:.2f}で、基準値1.0{('以下' if bpi_val <= 1.0 else '超過')}です。",
+        'comment_color': COLOR_GREEN if bpi_val <= 1.0 else COLOR_RED,
+        'worst_rooms': [f"・{room.get('name', '不明')}: {room.get('factor', '不明')} → {room.get('improvement', '改善策検討中')}"
+                        for room in (worst_rooms or [])[:3]],
+    }
+
+def add_envelope_worst_analysis_slide(prs, data):
+    _draw_envelope_slide(prs, _envelope_fields(data))
+
+def _draw_envelope_slide(prs, fields):
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    add_slide_title(slide, fields['title'])
 
     # BPI値の表示
     bpi_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.0), Inches(4.5), Inches(1.0))
     bpi_tf = bpi_box.text_frame
-    bpi_tf.text = f"{bpi_label} 値: {bpi_val:.2f}"
+    bpi_tf.text = fields['bpi_text']
     bpi_tf.paragraphs[0].font.size = Pt(36)
     bpi_tf.paragraphs[0].font.bold = True
     bpi_tf.paragraphs[0].font.color.rgb = COLOR_MAIN
@@ -231,9 +532,9 @@ def add_envelope_worst_analysis_slide(prs, data):
     # BPI評価コメント
     bpi_comment_box = slide.shapes.add_textbox(Inches(0.5), Inches(2.0), Inches(9), Inches(0.5))
     bpi_comment_tf = bpi_comment_box.text_frame
-    bpi_comment_tf.text = f"外皮性能は{bpi_val:.2f}で、基準値1.0{('以下' if bpi_val <= 1.0 else '超過')}です。"
+    bpi_comment_tf.text = fields['comment']
     bpi_comment_tf.paragraphs[0].font.size = Pt(14)
-    bpi_comment_tf.paragraphs[0].font.color.rgb = COLOR_GREEN if bpi_val <= 1.0 else COLOR_RED
+    bpi_comment_tf.paragraphs[0].font.color.rgb = fields['comment_color']
 
     # 改善のポイント
     points_box = slide.shapes.add_textbox(Inches(0.5), Inches(2.8), Inches(9), Inches(2.5))
@@ -258,8 +559,7 @@ def add_envelope_worst_analysis_slide(prs, data):
     p_airtightness.text = "● 気密性の向上"
     p_airtightness.font.size = Pt(12)
 
-    # 標準入力法の場合のみワースト室分析を追加
-    if not calc_method == 'model_building' and data.get('worst_rooms'):
+    if fields['worst_rooms']:
         worst_rooms_box = slide.shapes.add_textbox(Inches(5.5), Inches(1.0), Inches(4.0), Inches(4.0))
         worst_rooms_tf = worst_rooms_box.text_frame
         worst_rooms_tf.text = "ワースト要因の詳細分析:"
@@ -267,9 +567,9 @@ def add_envelope_worst_analysis_slide(prs, data):
         worst_rooms_tf.paragraphs[0].font.size = Pt(16)
         worst_rooms_tf.paragraphs[0].font.color.rgb = COLOR_RED
 
-        for i, room in enumerate(data.get('worst_rooms', [])[:3]): # 最大3つまで表示
+        for room_text in fields['worst_rooms']:
             p_room = worst_rooms_tf.add_paragraph()
-            p_room.text = f"・{room.get('name', '不明')}: {room.get('factor', '不明')} → {room.get('improvement', '改善策検討中')}"
+            p_room.text = room_text
             p_room.font.size = Pt(10)
             p_room.font.color.rgb = COLOR_BLACK
 
@@ -336,12 +636,17 @@ def add_standard_input_teaser_slide(prs, data):
     guidance_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
     guidance_tf.paragraphs[0].font.color.rgb = COLOR_BLACK
 
+def _roadmap_fields(data):
+    return [{'step': step['step'], 'title': step['title'], 'desc': step['desc']}
+            for step in generate_improvement_roadmap(data)]
+
 def add_improvement_roadmap_slide(prs, data):
+    _draw_roadmap_slide(prs, _roadmap_fields(data))
+
+def _draw_roadmap_slide(prs, roadmap):
     slide = prs.slides.add_slide(prs.slide_layouts[6])
     add_slide_title(slide, "4. ZEB化への改善ロードマップ")
     
-    roadmap = generate_improvement_roadmap(data)
-    
     # ロードマップの各ステップを配置
     for i, step in enumerate(roadmap):
         # カードの背景
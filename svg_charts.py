@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVGチャート生成モジュール
+HTMLレポートにインラインで埋め込むレーダーチャート・棒グラフを matplotlib を使わずに作る
+"""
+
+import html
+import numpy as np
+from report_generator import COLOR_MAIN, COLOR_GRAY, get_radar_values
+
+RADAR_CATEGORIES = ["空調", "換気", "照明", "給湯", "昇降機"]
+
+_FONT = "font-family=\"'Noto Sans CJK JP', sans-serif\""
+
+
+def _as_float(value):
+    # 数値でない値 (抽出できなかった項目など) は0として描く
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _points(xs, ys):
+    return ' '.join('%.1f,%.1f' % point for point in zip(xs, ys))
+
+def _svg(width, height, body):
+    return ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 %d %d" %s font-size="12">%s</svg>'
+            % (width, height, _FONT, ''.join(body)))
+
+
+def radar_chart_svg(values, categories=RADAR_CATEGORIES, base=1.0, title=None, size=360):
+    """
+    レーダーチャートのSVG (基準値 base の破線と設計値の多角形)
+    軸の向きは create_radar_chart と同じ (先頭の項目を右に置き、反時計回り)
+    """
+    values = np.array([_as_float(v) for v in values])
+    n = len(values)
+    r_max = max(values.max(), 1.5)
+    top = 30 if title else 10
+    radius = size * 0.32
+    cx, cy = size / 2, top + size * 0.42
+
+    angles = np.arange(n) * (2 * np.pi / n)
+    cos, sin = np.cos(angles), -np.sin(angles)
+    scale = radius / r_max
+
+    body = []
+    if title:
+        body.append('<text x="%.1f" y="20" text-anchor="middle" font-size="14">%s</text>'
+                    % (cx, html.escape(title)))
+
+    # 目盛 (0.5刻みの多角形) と軸
+    rings = np.arange(0.5, r_max + 1e-9, 0.5) * scale
+    for ring in rings:
+        body.append('<polygon points="%s" fill="none" stroke="#dddddd"/>'
+                    % _points(cx + ring * cos, cy + ring * sin))
+    ends_x, ends_y = cx + radius * cos, cy + radius * sin
+    body.extend('<line x1="%.1f" y1="%.1f" x2="%.1f" y2="%.1f" stroke="#dddddd"/>' % (cx, cy, x, y)
+                for x, y in zip(ends_x, ends_y))
+
+    # 基準値と設計値
+    body.append('<polygon points="%s" fill="%s" fill-opacity="0.1" stroke="%s" stroke-dasharray="4 3"/>'
+                % (_points(cx + base * scale * cos, cy + base * scale * sin), COLOR_GRAY, COLOR_GRAY))
+    body.append('<polygon points="%s" fill="%s" fill-opacity="0.25" stroke="%s" stroke-width="2"/>'
+                % (_points(cx + values * scale * cos, cy + values * scale * sin), COLOR_MAIN, COLOR_MAIN))
+
+    # 項目名 (左右は外側に寄せる)
+    label_x, label_y = cx + (radius + 16) * cos, cy + (radius + 16) * sin + 4
+    for x, y, c, category in zip(label_x, label_y, cos, categories):
+        anchor = 'start' if c > 0.1 else 'end' if c < -0.1 else 'middle'
+        body.append('<text x="%.1f" y="%.1f" text-anchor="%s">%s</text>'
+                    % (x, y, anchor, html.escape(category)))
+
+    # 凡例
+    legend_y = cy + radius + 36
+    body.append('<line x1="10" y1="%.1f" x2="30" y2="%.1f" stroke="%s" stroke-dasharray="4 3"/>'
+                '<text x="34" y="%.1f">基準値(%.1f)</text>'
+                % (legend_y, legend_y, COLOR_GRAY, legend_y + 4, base))
+    body.append('<line x1="10" y1="%.1f" x2="30" y2="%.1f" stroke="%s" stroke-width="2"/>'
+                '<text x="34" y="%.1f">設計値</text>'
+                % (legend_y + 16, legend_y + 16, COLOR_MAIN, legend_y + 20))
+    return _svg(size, int(legend_y + 28), body)
+
+
+def bar_chart_svg(values, categories=RADAR_CATEGORIES, base=1.0, title=None, width=360):
+    """
+    横棒グラフのSVG (基準値 base の位置に破線)
+    """
+    values = np.array([_as_float(v) for v in values])
+    v_max = max(values.max(), base * 1.5)
+    top = 30 if title else 10
+    left, right, row = 60, 40, 26
+    plot_width = width - left - right
+    lengths = values / v_max * plot_width
+    ys = top + np.arange(len(values)) * row
+
+    body = []
+    if title:
+        body.append('<text x="%.1f" y="20" text-anchor="middle" font-size="14">%s</text>'
+                    % (width / 2, html.escape(title)))
+    for y, length, value, category in zip(ys, lengths, values, categories):
+        body.append('<text x="%d" y="%.1f" text-anchor="end">%s</text>'
+                    '<rect x="%d" y="%.1f" width="%.1f" height="%d" fill="%s"/>'
+                    '<text x="%.1f" y="%.1f">%.2f</text>'
+                    % (left - 6, y + 15, html.escape(category), left, y + 3, length, row - 8, COLOR_MAIN,
+                       left + length + 4, y + 15, value))
+    base_x = left + base / v_max * plot_width
+    bottom = top + len(values) * row
+    body.append('<line x1="%.1f" y1="%d" x2="%.1f" y2="%d" stroke="%s" stroke-dasharray="4 3"/>'
+                % (base_x, top, base_x, bottom, COLOR_GRAY))
+    return _svg(width, bottom + 6, body)
+
+
+def create_radar_chart_svg(data, title=None):
+    """
+    設備別BEImのレーダーチャート (create_radar_chart のSVG版)
+    """
+    return radar_chart_svg(get_radar_values(data), title=title)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+比較用: 1行走査に置き換える前の extract_data_from_markdown (文書全体への re.search)
+"""
+
+import re
+
+
+def extract_data_from_markdown(content):
+    """
+    Markdownからデータを抽出する
+    """
+    data = {
+        'building_name': '不明',
+        'total_area': 0.0,
+        'location': '不明',
+        'region': '不明',
+        'solar_region': '不明',
+        'building_model': '不明',
+        'calculation_method': 'standard_input',
+        'bei_total': 1.0,
+        'bpi': 1.0,
+        'bei_ac': 1.0,
+        'bei_v': 1.0,
+        'bei_l': 1.0,
+        'bei_hw': 1.0,
+        'bei_ev': 1.0,
+        'solar_pv': 'なし',
+        'cgs': 'なし',
+        'judgment': {},
+        'envelope_details': {},
+        'equipment_details': {},
+        'energy_consumption': {}
+    }
+
+    # モデル建物法かどうかの判定
+    if "モデル建物法" in content:
+        data['calculation_method'] = 'model_building'
+
+    # 基本情報の抽出
+    m = re.search(r'建築物の名称\s*\n\s*(.*)', content)
+    if m: data['building_name'] = m.group(1).strip()
+    
+    m = re.search(r'床面積\s*\n\s*([\d,.]+)', content)
+    if m: data['total_area'] = float(m.group(1).replace(',', ''))
+    
+    m = re.search(r'所在地[:：]\s*(.*)', content)
+    if m: data['location'] = m.group(1).strip()
+
+    m = re.search(r'地域区分/年間日射地域区分\s*\n\s*(.*)/(.*)', content)
+    if m:
+        data['region'] = m.group(1).strip()
+        data['solar_region'] = m.group(2).strip()
+
+    m = re.search(r'モデル建物\s*\n\s*(.*)', content)
+    if m: data['building_model'] = m.group(1).strip()
+
+    # BEI/BPIの抽出
+    m = re.search(r'年間熱負荷係数\s*【BPIm?】\s*\|\s*([\d.]+)', content)
+    if m: data['bpi'] = float(m.group(1))
+    
+    m = re.search(r'一次エネルギー消費量\s*【BEIm?】\s*\|\s*([\d.]+)', content)
+    if m: data['bei_total'] = float(m.group(1))
+
+    m = re.search(r'【誘導BEIm】\s*\|\s*([\d.]+)', content)
+    if m: data['bei_target'] = float(m.group(1))
+
+    # 設備別BEI
+    m = re.search(r'空気調和設備\s*【BEIm?/AC】\s*\|\s*([\d.]+)', content)
+    if m: data['bei_ac'] = float(m.group(1))
+    m = re.search(r'機械換気設備\s*【BEIm?/V】\s*\|\s*([\d.]+)', content)
+    if m: data['bei_v'] = float(m.group(1))
+    m = re.search(r'照明設備\s*【BEIm?/L】\s*\|\s*([\d.]+)', content)
+    if m: data['bei_l'] = float(m.group(1))
+    m = re.search(r'給湯設備\s*【BEIm?/HW】\s*\|\s*([\d.]+)', content)
+    if m: data['bei_hw'] = float(m.group(1))
+    m = re.search(r'昇降機\s*【BEIm?/EV】\s*\|\s*([\d.]+)', content)
+    if m: data['bei_ev'] = float(m.group(1))
+
+    m = re.search(r'太陽光発電\s*\|\s*(.*)', content)
+    if m: data['solar_pv'] = m.group(1).strip()
+    m = re.search(r'コージェネレーション設備\s*\|\s*(.*)', content)
+    if m: data['cgs'] = m.group(1).strip()
+
+    # 判定結果
+    data['judgment'] = {
+        'base': '達成' if data['bei_total'] <= 1.0 else '非達成',
+        'large': '達成' if data['bei_total'] <= 0.8 else '非達成',
+        'target': '達成' if data.get('bei_target', 1.0) <= 0.6 else '非達成'
+    }
+
+    # 数値変換を試みるヘルパー関数
+    def to_float_or_str(value):
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return value
+
+    # モデル建物法詳細項目の抽出 (PAL6-23)
+    for code in range(6, 24):
+        pattern = rf'PAL{code}\s*\|\s*[^|]*\|\s*([\d.]+)'
+        m = re.search(pattern, content)
+        if m: data['envelope_details'][f'PAL{code}'] = to_float_or_str(m.group(1))
+
+    # 空調詳細 (AC1, AC4, AC6, AC7, AC10, AC12, AC13)
+    for code in [1, 4, 6, 7, 10, 12, 13]:
+        pattern = rf'AC{code}\s*\|\s*[^|]*\|\s*([^|\n]*)'
+        m = re.search(pattern, content)
+        if m: data['equipment_details'][f'AC{code}'] = to_float_or_str(m.group(1).strip())
+
+    # 換気 (V5-7)
+    v_sections = [("機械室", "V_機械室"), ("便所", "V_便所"), ("駐車場", "V_駐車場"), ("厨房", "V_厨房")]
+    for section_name, key_name in v_sections:
+        section_pattern = rf'\*\*{section_name}\*\*\n.*?\| V5 \|.*?\| ([^|\n]*) \|.*?\| V6 \|.*?\| ([^|\n]*) \|.*?\| V7 \|.*?\| ([^|\n]*) \|'
+        m = re.search(section_pattern, content, re.DOTALL)
+        if m:
+            data['equipment_details'][key_name] = {
+                'V5': m.group(1).strip(),
+                'V6': m.group(2).strip(),
+                'V7': m.group(3).strip()
+            }
+
+    # 照明 (L4-7)
+    l_pattern = r'\| L4 \|.*?\| ([^|\n]*) \|.*?\| L5 \|.*?\| ([^|\n]*) \|.*?\| L6 \|.*?\| ([^|\n]*) \|.*?\| L7 \|.*?\| ([^|\n]*) \|'
+    m = re.search(l_pattern, content, re.DOTALL)
+    if m:
+        data['equipment_details']['L'] = {
+            'L4': m.group(1).strip(),
+            'L5': m.group(2).strip(),
+            'L6': m.group(3).strip(),
+            'L7': m.group(4).strip()
+        }
+
+    # 給湯 (HW4-5)
+    hw_sections = [("洗面手洗い", "HW_洗面手洗い"), ("浴室", "HW_浴室"), ("厨房", "HW_厨房")]
+    for section_name, key_name in hw_sections:
+        section_pattern = rf'\*\*{section_name}\*\*\n.*?\| HW4 \|.*?\| ([^|\n]*) \|.*?\| HW5 \|.*?\| ([^|\n]*) \|'
+        m = re.search(section_pattern, content, re.DOTALL)
+        if m:
+            data['equipment_details'][key_name] = {
+                'HW4': m.group(1).strip(),
+                'HW5': m.group(2).strip()
+            }
+
+    return data
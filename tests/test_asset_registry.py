@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+画像の管理 (asset_registry) の確認
+"""
+
+import os
+
+import asset_registry
+from asset_registry import AssetRegistry
+
+
+def test_missing_asset_is_not_searched_again(tmp_path, monkeypatch):
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    first.mkdir()
+    second.mkdir()
+    registry = AssetRegistry([str(first), str(second)])
+    assert registry.get_bytes('chart.png') is None
+
+    probes = []
+    exists = os.path.exists
+    monkeypatch.setattr(asset_registry.os.path, 'exists', lambda path: probes.append(path) or exists(path))
+    assert registry.get_bytes('chart.png') is None
+    assert registry.get_base64('chart.png') == ''
+    assert probes == []
+
+
+def test_missing_asset_is_found_once_added(tmp_path):
+    registry = AssetRegistry([str(tmp_path / 'first'), str(tmp_path)])
+    assert registry.get_bytes('chart.png') is None
+    (tmp_path / 'chart.png').write_bytes(b'\x89PNG')
+    assert registry.get_bytes('chart.png') == b'\x89PNG'
+    # 探索先のディレクトリが後から作られた場合も探し直す
+    assert registry.get_bytes('logo.png') is None
+    (tmp_path / 'first').mkdir()
+    (tmp_path / 'first' / 'logo.png').write_bytes(b'GIF8')
+    assert registry.get_bytes('logo.png') == b'GIF8'
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+一括生成 (batch_report) の出力先の確認
+"""
+
+import os
+import shutil
+
+from batch_report import main, output_paths, summarize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE = os.path.join(HERE, '..', 'test_sample.txt')
+
+
+def test_output_paths_mirror_input_directories(tmp_path):
+    paths = [str(tmp_path / 'in' / 'a' / 'report.md'), str(tmp_path / 'in' / 'b' / 'report.md'),
+             str(tmp_path / 'in' / 'c.md')]
+    assert output_paths(paths, 'out') == [os.path.join('out', 'a', 'report.html'),
+                                          os.path.join('out', 'b', 'report.html'),
+                                          os.path.join('out', 'c.html')]
+    assert output_paths(paths[:1], 'out', 'pptx') == [os.path.join('out', 'report.pptx')]
+
+
+def test_same_name_in_different_directories(tmp_path, capsys):
+    for name in ('a', 'b'):
+        os.makedirs(tmp_path / 'in' / name)
+        shutil.copy(SAMPLE, tmp_path / 'in' / name / 'report.md')
+    # 同じディレクトリで拡張子だけ違う入力は出力先が重なるため失敗とする
+    shutil.copy(SAMPLE, tmp_path / 'in' / 'a' / 'report.txt')
+    out = tmp_path / 'out'
+    assert main([str(tmp_path / 'in' / '**' / 'report.*'), '-o', str(out), '-j', '1']) == 1
+    assert (out / 'a' / 'report.html').is_file()
+    assert (out / 'b' / 'report.html').is_file()
+    summary = capsys.readouterr().out
+    assert '2/3 件成功' in summary
+    assert '重複' in summary
+
+
+def test_summary_skips_inputs_that_did_not_run():
+    results = [('a.md', None, 0.010), ('b.md', None, 0.030), ('c.md', '出力先が重複しています', None)]
+    summary = summarize(results, 1.0)
+    assert '2/3 件成功 (1.00秒, 2.0 件/秒)' in summary
+    assert 'p50 20.0ms' in summary
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+PDF読み込み (pdf_ingest) の確認
+"""
+
+import io
+import os
+
+import pytest
+
+import pdf_ingest
+from pdf_ingest import PageCache, _source_buffer, pdf_to_markdown
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PDF_PATH = os.path.join(HERE, '..', 'test_model.pdf')
+
+
+@pytest.mark.parametrize('opener', [
+    lambda: open(PDF_PATH, 'rb'),
+    lambda: io.BytesIO(open(PDF_PATH, 'rb').read()),
+], ids=['file', 'bytesio'])
+def test_source_buffer_propagates_caller_errors(opener):
+    # with 本体の例外がそのまま呼び出し側に届く (RuntimeError に化けない)
+    with opener() as source:
+        with pytest.raises(ValueError, match='caller'):
+            with _source_buffer(source):
+                raise ValueError('caller')
+
+
+def test_source_buffer_falls_back_to_read():
+    with open(PDF_PATH, 'rb') as f:
+        content = f.read()
+    with _source_buffer(io.BytesIO(content)) as (buffer, path):
+        assert bytes(buffer) == content
+        assert path is None
+    with open(PDF_PATH, 'rb') as f, _source_buffer(f) as (buffer, path):
+        assert buffer[:len(content)] == content
+        assert path == f.name
+
+
+def test_page_cache_stores_json(tmp_path):
+    cache = PageCache(str(tmp_path / 'pages'))
+    assert cache.usable()
+    assert os.stat(cache.directory).st_mode & 0o777 == 0o700
+    page = {'index': 0, 'text': '入力シートによる入力項目', 'tables': [[['AC1', None, '有']]]}
+    cache.put('key', page)
+    assert os.listdir(tmp_path / 'pages' / 'key') == ['0.json']
+    assert cache.get('key', 0) == page
+
+
+def test_page_cache_rejects_shared_directory(tmp_path):
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    assert not PageCache(str(shared)).usable()
+
+
+def test_pdf_to_markdown_uses_page_cache(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / 'pages'))
+    monkeypatch.setattr(pdf_ingest, '_PAGE_CACHE', cache)
+    markdown = pdf_to_markdown(PDF_PATH, workers=1)
+    assert any(name.endswith('.json') for _, _, names in os.walk(cache.directory) for name in names)
+    assert pdf_to_markdown(PDF_PATH, workers=1) == markdown
+
+
+@pytest.mark.parametrize('as_bytes', [False, True], ids=['path', 'bytes'])
+def test_parallel_matches_serial(monkeypatch, as_bytes):
+    monkeypatch.setattr(pdf_ingest, '_PAGE_CACHE', None)
+    with open(PDF_PATH, 'rb') as f:
+        content = f.read()
+    source = content if as_bytes else PDF_PATH
+    assert pdf_to_markdown(source, workers=2) == pdf_to_markdown(source, workers=1)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+ポートフォリオ (portfolio) の列の型と保存の確認
+"""
+
+import math
+
+import pytest
+
+from portfolio import Portfolio
+from report_generator import extract_data_from_markdown
+
+MODEL_DOCUMENT = """モデル建物法
+| AC1 | 主たる熱源機種（冷房） | パッケージエアコンディショナ(空冷式) |
+| AC4 | 床面積あたりの熱源容量（冷房） | 353.00 [W/m2] |
+| AC10 | 床面積あたりの熱源容量（暖房） | 1,394.53 [W/m2] |
+| AC13 | 全熱交換器の有無 | %s |
+"""
+
+
+@pytest.fixture
+def portfolio():
+    reports = [extract_data_from_markdown(MODEL_DOCUMENT % value) for value in ('無', '0.5', '有')]
+    reports.append(extract_data_from_markdown(''))
+    return Portfolio.from_reports(reports)
+
+
+def test_unit_values_use_leading_number(portfolio):
+    assert portfolio.frame['ac4'].tolist()[:3] == [353.0, 353.0, 353.0]
+    assert portfolio.frame['ac10'].tolist()[0] == 1394.53
+    assert math.isnan(portfolio.frame['ac4'].tolist()[3])
+
+
+def test_mixed_category_values_are_text(portfolio):
+    assert portfolio.frame['ac13'].tolist() == ['無', '0.5', '有', '無']
+
+
+@pytest.mark.parametrize('suffix', ['.parquet', '.feather'])
+def test_save_and_load(portfolio, tmp_path, suffix):
+    path = tmp_path / f'portfolio{suffix}'
+    portfolio.save(path)
+    loaded = Portfolio.load(path)
+    assert loaded.frame['ac13'].astype(object).tolist() == ['無', '0.5', '有', '無']
+    assert loaded.frame['ac4'].tolist()[:3] == [353.0, 353.0, 353.0]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+抽出処理 (report_generator) の確認
+1行走査の抽出処理が置き換え前の抽出処理 (baseline_parser) と同じ結果を返すこと、
+ストリームからの抽出が必要な項目の揃った時点で読み込みを止めること
+"""
+
+import io
+import os
+import random
+
+import pytest
+
+from baseline_parser import extract_data_from_markdown as baseline_extract
+from report_generator import SUMMARY_FIELDS, extract_data_from_markdown, extract_data_from_stream
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# 見出し名の無い見出し行・強調だけの行
+HEADING_MARKS = ['#', '##', '###', '#### ', '# ', '**', '****']
+
+
+def _sample_lines():
+    with open(os.path.join(HERE, '..', 'test_sample.txt'), encoding='utf-8') as f:
+        return f.read().split('\n')
+
+
+def _mutate(lines, seed):
+    """
+    見出しだけの行を挿入したり、既存の行と置き換えたりする
+    """
+    rng = random.Random(seed)
+    lines = list(lines)
+    for _ in range(rng.randint(1, 5)):
+        index = rng.randrange(len(lines))
+        if rng.random() < 0.5:
+            lines.insert(index, rng.choice(HEADING_MARKS))
+        else:
+            lines[index] = rng.choice(HEADING_MARKS)
+    return '\n'.join(lines)
+
+
+@pytest.mark.parametrize('content', [
+    '#\nfoo',
+    '##',
+    '**\n**機械室**\n#\n| V5 | 高効率電動機の有無 | 無 |',
+    '建築物の名称\n#\n床面積\n##\n123.4',
+])
+def test_bare_heading_lines(content):
+    assert extract_data_from_markdown(content) == baseline_extract(content)
+
+
+def test_sample_matches_baseline():
+    content = '\n'.join(_sample_lines())
+    assert extract_data_from_markdown(content) == baseline_extract(content)
+
+
+@pytest.mark.parametrize('seed', range(400))
+def test_mutated_sample_matches_baseline(seed):
+    content = _mutate(_sample_lines(), seed)
+    assert extract_data_from_markdown(content) == baseline_extract(content)
+
+
+def _model_document():
+    pytest.importorskip('pdfplumber')
+    from pdf_ingest import pdf_to_markdown
+    return pdf_to_markdown(os.path.join(HERE, '..', 'test_model.pdf')).encode('utf-8')
+
+
+def test_stream_stops_when_fields_are_filled():
+    content = _model_document()
+    stream = io.BytesIO(content)
+    data = extract_data_from_stream(stream, chunk_size=256, fields=SUMMARY_FIELDS)
+    assert stream.tell() < len(content)
+    full = extract_data_from_markdown(content.decode('utf-8'))
+    for field in SUMMARY_FIELDS:
+        assert data[field] == full[field]
+
+
+def test_stream_reads_to_end_without_fields():
+    content = _model_document()
+    stream = io.BytesIO(content)
+    assert extract_data_from_stream(stream, chunk_size=256) == extract_data_from_markdown(content.decode('utf-8'))
+    assert stream.tell() == len(content)
+
+
+def test_stream_rejects_unknown_fields():
+    with pytest.raises(ValueError):
+        extract_data_from_stream(io.BytesIO(b''), fields=['no_such_field'])
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+PowerPoint作成 (slides) の確認
+マスターへの差し込み (use_template=True) が毎回の組み立て (use_template=False) と同じスライドになること
+"""
+
+import hashlib
+import io
+import os
+import re
+import zipfile
+
+import pytest
+
+pytest.importorskip('pptx')
+pytest.importorskip('matplotlib')
+
+from pptx import Presentation
+
+from report_generator import create_radar_chart, extract_data_from_markdown
+from slides import _deck_fields, _fits_template, create_presentation, get_chart_images
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+_MEDIA_RE = re.compile(r'\.\./media/([\w.]+)')
+
+
+def _standard_input():
+    with open(os.path.join(HERE, '..', 'test_sample.txt'), encoding='utf-8') as f:
+        return extract_data_from_markdown(f.read())
+
+
+def _model_building():
+    pytest.importorskip('pdfplumber')
+    from pdf_ingest import pdf_to_markdown
+    return extract_data_from_markdown(pdf_to_markdown(os.path.join(HERE, '..', 'test_model.pdf')))
+
+
+def _normalized_parts(pptx_bytes):
+    """
+    パート名 → 内容 (画像のファイル名は内容のハッシュに置き換える)
+    """
+    with zipfile.ZipFile(pptx_bytes) as package:
+        assert package.testzip() is None
+        parts = {name: package.read(name) for name in package.namelist()}
+    media = {name[len('ppt/media/'):]: hashlib.sha1(blob).hexdigest()
+             for name, blob in parts.items() if name.startswith('ppt/media/')}
+    normalized = {}
+    for name, blob in parts.items():
+        if name.startswith('ppt/media/'):
+            normalized[f'media:{media[name[len("ppt/media/"):]]}'] = blob
+        elif name.endswith('.rels'):
+            text = _MEDIA_RE.sub(lambda m: f'../media/{media[m.group(1)]}', blob.decode('utf-8'))
+            normalized[name] = text.encode('utf-8')
+        else:
+            normalized[name] = blob
+    return normalized
+
+
+def _both_ways(data, images=None):
+    chart_stacked, chart_pie = get_chart_images()
+    images = images or (chart_stacked, chart_pie, create_radar_chart(data))
+    template = create_presentation(data, *images, use_template=True)
+    assembled = create_presentation(data, *images, use_template=False)
+    return template, assembled
+
+
+@pytest.mark.parametrize('load', [_standard_input, _model_building], ids=['standard_input', 'model_building'])
+def test_template_matches_assembled_deck(load):
+    data = load()
+    template, assembled = _both_ways(data)
+    assert _normalized_parts(template) == _normalized_parts(assembled)
+    assert len(Presentation(template).slides) == len(Presentation(assembled).slides)
+
+
+def test_values_that_do_not_fit_fall_back_to_assembling():
+    data = _standard_input()
+    data['building_name'] = '本館\n別館'
+    chart_stacked, chart_pie = get_chart_images()
+    images = {'stacked': chart_stacked, 'pie': chart_pie, 'bei': create_radar_chart(data)}
+    assert not _fits_template(_deck_fields(data), images)
+    template, assembled = _both_ways(data, (chart_stacked, chart_pie, images['bei']))
+    assert _normalized_parts(template) == _normalized_parts(assembled)
+    title = Presentation(template).slides[0]
+    assert any('本館' in shape.text_frame.text for shape in title.shapes if shape.has_text_frame)
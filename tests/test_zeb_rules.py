@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+ZEB比較ルール (zeb_rules) の確認
+"""
+
+from report_generator import extract_data_from_markdown
+from report_model import as_report
+from zeb_rules import ZEB_RULES, ZebRule, report_value, zeb_comparison
+
+DOCUMENT = """モデル建物法
+所在地：東京都千代田区
+| PAL12 | 外壁の平均熱貫流率 | 0.36 [W/m2K] |
+
+**機械室**
+| V5 | 高効率電動機の有無 | 無 |
+| V6 | インバータの有無 | 無 |
+| V7 | 送風量制御の有無 | 有 |
+
+**事務室**
+| L4 | 在室検知制御 | 有 |
+| L5 | 明るさ検知制御 | 無 |
+| L6 | タイムスケジュール制御 | 無 |
+| L7 | 初期照度補正制御 | 無 |
+"""
+
+
+def test_report_value_codes_and_top_level_fields():
+    report = as_report(extract_data_from_markdown(DOCUMENT))
+    assert report_value(report, 'pal12') == 0.36
+    assert report_value(report, 'v7_機械室') == '有'
+    assert report_value(report, 'l4') == '有'
+    # "l" や "v" で始まる項目コード以外の列は BuildingReport の属性
+    assert report_value(report, 'location') == '東京都千代田区'
+
+
+def test_rule_on_location():
+    rules = ZEB_RULES + [ZebRule('所在地', 'location', 'contains', ('東京',), "東京", '-', None, '対象外')]
+    comparison = zeb_comparison(extract_data_from_markdown(DOCUMENT), rules)
+    assert comparison[-1]['current'] == '東京都千代田区'
+    assert comparison[-1]['status'] == '良好'
+    assert comparison[0]['status'] == '良好'
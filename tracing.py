@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+処理段階ごとの計測 (スパン)
+with span("parse") as s: ... で所要時間と生成したバイト数を記録し、JSON 1行のログとして出力する
+with trace("report") as t: ... の内側で記録したスパンは t.spans にも集める (画面での内訳表示用)
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# ログの出力先 (configure_logging を呼ぶまでは INFO のログは出ない)
+logger = logging.getLogger("one_building.trace")
+
+# 実行中のトレースと、実行中のスパンの名前 (親子関係の記録用)
+_current_trace = contextvars.ContextVar("one_building_trace", default=None)
+_current_span = contextvars.ContextVar("one_building_span", default=None)
+
+
+class Span:
+    """
+    1段階分の計測結果
+    """
+
+    __slots__ = ("name", "parent", "start", "duration_ms", "bytes", "attrs")
+
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.bytes = None
+        self.attrs = dict(attrs or {})
+
+    def add_bytes(self, value):
+        """
+        生成したデータの大きさを加える (文字列は UTF-8 での大きさ)
+        """
+        if isinstance(value, str):
+            value = len(value.encode("utf-8"))
+        elif not isinstance(value, int):
+            value = len(value)
+        self.bytes = (self.bytes or 0) + value
+        return self
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def to_dict(self):
+        record = {"span": self.name, "duration_ms": round(self.duration_ms or 0.0, 3)}
+        if self.parent:
+            record["parent"] = self.parent
+        if self.bytes is not None:
+            record["bytes"] = self.bytes
+        record.update(self.attrs)
+        return record
+
+
+class Trace:
+    """
+    1件の処理 (レポート1件の作成など) の中で記録したスパンの一覧
+    """
+
+    def __init__(self, name, trace_id=None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.spans = []
+        self.duration_ms = None
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self):
+        """
+        スパンの辞書の一覧 (終了順)
+        """
+        with self._lock:
+            return [span.to_dict() for span in self.spans]
+
+
+def _emit(record):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    ブロックの所要時間を計る (例外で抜けた場合は error に例外名を記録する)
+    """
+    current = Span(name, _current_span.get(), attrs)
+    token = _current_span.set(name)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration_ms = (time.perf_counter() - current.start) * 1000
+        active = _current_trace.get()
+        record = current.to_dict()
+        if active is not None:
+            active.add(current)
+            record["trace_id"] = active.trace_id
+        _emit(record)
+
+
+@contextmanager
+def trace(name, trace_id=None):
+    """
+    内側で記録したスパンを Trace にまとめる。終了時に合計時間のログを出す
+    """
+    active = Trace(name, trace_id)
+    token = _current_trace.set(active)
+    start = time.perf_counter()
+    try:
+        yield active
+    finally:
+        _current_trace.reset(token)
+        active.duration_ms = (time.perf_counter() - start) * 1000
+        _emit({"trace": name, "trace_id": active.trace_id, "duration_ms": round(active.duration_ms, 3),
+               "spans": len(active.spans)})
+
+
+def configure_logging(stream=None, level=logging.INFO):
+    """
+    スパンのログを stream (既定は標準エラー) に JSON 1行ずつ出す
+    環境変数 ONE_BUILDING_TRACE_LOG を指定した場合はそのファイルに追記する
+    """
+    path = os.environ.get("ONE_BUILDING_TRACE_LOG")
+    for handler in list(logger.handlers):
+        if getattr(handler, "_one_building_trace", False):
+            logger.removeHandler(handler)
+            handler.close()
+    handler = logging.FileHandler(path, encoding="utf-8") if path and stream is None else logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler._one_building_trace = True
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    # ルートロガー (Streamlit のログなど) には流さない
+    logger.propagate = False
+    return handler
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ZEB化相当との比較ルール
+ルールは表 (ZEB_RULES) で定義し、1棟でも複数棟でも列 (NumPy配列) 単位でまとめて判定する
+"""
+
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from report_model import as_report, format_value
+
+# category: 表示名, field: 判定する列, operator: 比較 (le / ge / eq / contains), threshold: しきい値
+# zeb_target: 目標の表示, action: 改善策, display: 数値の表示書式, fail_status: 満たさない場合の状態
+ZebRule = namedtuple('ZebRule', ['category', 'field', 'operator', 'threshold', 'zeb_target', 'action',
+                                 'display', 'fail_status'])
+
+ZEB_RULES = [
+    # 外皮性能
+    ZebRule('外壁U値', 'pal12', 'le', 0.6, "0.60以下", '断熱材の厚肉化', "{:.2f}", '要改善'),
+    ZebRule('窓U値', 'pal20', 'le', 2.33, "2.33以下", 'Low-E複層ガラス採用', "{:.2f}", '要改善'),
+    ZebRule('開口率', 'opening_ratio', 'le', 30, "30%以下", '窓面積の削減、高断熱化', "{:.1f}%", '要改善'),
+    # 空調
+    ZebRule('主たる熱源', 'ac1', 'contains', ('ヒートポンプ', 'エアコン'), "高効率ヒートポンプ等",
+            '電気式高効率ヒートポンプへの転換', None, '要検討'),
+    ZebRule('熱源効率 (AC6)', 'ac6', 'ge', 1.2, "1.2以上", '高効率熱源機の導入', "{:.2f}", '要改善'),
+    ZebRule('全熱交換器', 'ac13', 'eq', '有', "有", '全熱交換器の導入', None, '要検討'),
+    # 換気 (V7: 送風量制御)
+    ZebRule('換気制御 (機械室)', 'v7_機械室', 'eq', '有', "有", '送風量制御の導入', None, '要検討'),
+    ZebRule('換気制御 (便所)', 'v7_便所', 'eq', '有', "有", '送風量制御の導入', None, '要検討'),
+    ZebRule('換気制御 (駐車場)', 'v7_駐車場', 'eq', '有', "有", '送風量制御の導入', None, '要検討'),
+    ZebRule('換気制御 (厨房)', 'v7_厨房', 'eq', '有', "有", '送風量制御の導入', None, '要検討'),
+    # 照明 (L4-7)
+    ZebRule('照明制御 (在室検知)', 'l4', 'eq', '有', "有", '人感センサーの導入', None, '要検討'),
+    ZebRule('照明制御 (明るさ)', 'l5', 'eq', '有', "有", '昼光利用制御の導入', None, '要検討'),
+    ZebRule('照明制御 (時間)', 'l6', 'eq', '有', "有", '時間制御の導入', None, '要検討'),
+    ZebRule('照明制御 (部分照明)', 'l7', 'eq', '有', "有", '部分照明の導入', None, '要検討'),
+    # 給湯 (HW5: 節湯器具)
+    ZebRule('給湯設備 (洗面節湯)', 'hw5_洗面手洗い', 'eq', '有', "有", '節湯器具の導入', None, '要検討'),
+    ZebRule('給湯設備 (浴室節湯)', 'hw5_浴室', 'eq', '有', "有", '節湯器具の導入', None, '要検討'),
+    ZebRule('給湯設備 (厨房節湯)', 'hw5_厨房', 'eq', '有', "有", '節湯器具の導入', None, '要検討'),
+]
+
+PASS_STATUS = '良好'
+
+# 開口率の計算に使う列
+_WALL_FIELDS = ['pal6', 'pal7', 'pal8', 'pal9']
+_WINDOW_FIELDS = ['pal15', 'pal16', 'pal17', 'pal18']
+# 詳細項目の列名 (項目の種類, 番号, 室名)
+_CODE_RE = re.compile(r'(pal|ac|hw|v|l)(\d+)(?:_(.+))?$')
+
+
+def report_value(report, name):
+    """
+    列名に対応する BuildingReport の値
+    "pal12" / "ac6" / "v7_機械室" のような項目コード ("_" の後ろは室名 (換気・給湯)) は詳細項目、
+    それ以外 ("location" など) は BuildingReport の属性
+    """
+    m = _CODE_RE.match(name)
+    if m is None:
+        return getattr(report, name)
+    group, code, room = m.group(1), m.group(1) + m.group(2), m.group(3) or ''
+    equipment = report.equipment
+    if group == 'pal':
+        return getattr(report.envelope, code)
+    if group == 'ac':
+        return getattr(equipment, code)
+    if group == 'hw':
+        return getattr(equipment.hot_water_control(room), code)
+    if group == 'v':
+        return getattr(equipment.ventilation_control(room), code)
+    return getattr(equipment.lighting_control(), code)
+
+
+def rule_fields(rules=None):
+    """
+    ルールの判定に必要な列 (計算で求める列はその元の列)
+    """
+    names = []
+    for rule in rules or ZEB_RULES:
+        if rule.field == 'opening_ratio':
+            names.extend(_WALL_FIELDS + _WINDOW_FIELDS)
+        else:
+            names.append(rule.field)
+    return list(dict.fromkeys(names))
+
+
+def reports_to_columns(reports, rules=None):
+    """
+    抽出結果 (辞書または BuildingReport) の並びを、判定に必要な列の辞書にする
+    """
+    reports = [as_report(report) for report in reports]
+    return {name: np.array([report_value(report, name) for report in reports], dtype=object)
+            for name in rule_fields(rules)}
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if values.dtype.kind in 'fiu':
+        return values.astype(float)
+    # 数値でない値 (None や "-" など) は NaN (比較は常に偽)
+    return np.array([value if isinstance(value, (int, float)) else np.nan for value in values], dtype=float)
+
+
+def _as_text(values):
+    return np.asarray(values, dtype=object).astype(str)
+
+
+def _opening_ratio(columns):
+    """
+    開口率 (%) = 窓面積 / (外壁面積 + 窓面積)。面積が無い場合は0
+    """
+    wall = np.nan_to_num(np.stack([_as_float(columns[name]) for name in _WALL_FIELDS])).sum(axis=0)
+    window = np.nan_to_num(np.stack([_as_float(columns[name]) for name in _WINDOW_FIELDS])).sum(axis=0)
+    total = wall + window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, window / np.where(total > 0, total, 1) * 100, 0.0)
+
+
+def _test(rule, values):
+    if rule.operator == 'le':
+        return _as_float(values) <= rule.threshold
+    if rule.operator == 'ge':
+        return _as_float(values) >= rule.threshold
+    if rule.operator == 'eq':
+        return _as_text(values) == rule.threshold
+    if rule.operator == 'contains':
+        text = _as_text(values)
+        passed = np.zeros(len(text), dtype=bool)
+        for word in rule.threshold:
+            passed |= np.char.find(text, word) >= 0
+        return passed
+    raise ValueError(f"unknown operator: {rule.operator}")
+
+
+def rule_values(columns, rules=None):
+    """
+    各ルールが判定する値の列 (計算で求める列を補ったもの)
+    """
+    values = {}
+    for rule in rules or ZEB_RULES:
+        if rule.field not in values:
+            if rule.field == 'opening_ratio':
+                values[rule.field] = _opening_ratio(columns)
+            else:
+                values[rule.field] = np.asarray(columns[rule.field])
+    return values
+
+
+def evaluate_zeb_rules(columns, rules=None):
+    """
+    列の辞書 (列名 → 建物数の長さの配列) に全ルールを適用する
+    (建物数 × ルール数) の判定結果 (True: 良好) と、ルールごとの達成率を返す
+    """
+    rules = rules or ZEB_RULES
+    passed = _evaluate(rule_values(columns, rules), rules)
+    pass_rates = passed.mean(axis=0) if len(passed) else np.zeros(len(rules))
+    return passed, pass_rates
+
+
+def _evaluate(values, rules):
+    count = len(next(iter(values.values()))) if values else 0
+    passed = np.empty((count, len(rules)), dtype=bool)
+    for i, rule in enumerate(rules):
+        passed[:, i] = _test(rule, values[rule.field])
+    return passed
+
+
+def _display(rule, value):
+    if rule.display and isinstance(value, (int, float)) and not np.isnan(value):
+        return rule.display.format(value)
+    return format_value(value)
+
+
+def zeb_comparison(data, rules=None):
+    """
+    1棟分のZEB化相当との比較 (ルールごとの辞書の一覧)
+    """
+    rules = rules or ZEB_RULES
+    report = as_report(data)
+    columns = reports_to_columns([report], rules)
+    values = rule_values(columns, rules)
+    passed = _evaluate(values, rules)
+    comparison = []
+    for i, rule in enumerate(rules):
+        value = values[rule.field][0]
+        comparison.append({
+            'category': rule.category,
+            'current': _display(rule, value.item() if isinstance(value, np.generic) else value),
+            'zeb_target': rule.zeb_target,
+            'status': PASS_STATUS if passed[0, i] else rule.fail_status,
+            'action': rule.action,
+        })
+    return comparison